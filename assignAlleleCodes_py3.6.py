@@ -26,20 +26,37 @@ Author:
 # Stdlib imports
 import os
 import sys
-import gzip
+import csv
 import json
 import shutil
+import time
 import traceback
 import logging
 import logging.handlers
 import argparse
-from functools import partial
+from array import array
+from functools import partial, lru_cache
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from collections import defaultdict, namedtuple
+from collections import defaultdict, namedtuple, Counter, OrderedDict
+
+# Optional imports
+try:
+	import orjson	# faster JSON (de)serialization, used in place of json module if installed
+except ImportError:
+	orjson = None
+try:
+	from isal import igzip as gzip	# ISA-L accelerated gzip (levels 0-3), used in place of gzip module if installed
+	DEFAULT_COMPRESS_LEVEL, MAX_COMPRESS_LEVEL = 2, 3
+except ImportError:
+	import gzip
+	DEFAULT_COMPRESS_LEVEL, MAX_COMPRESS_LEVEL = 6, 9
 
 #============ GLOBAL VARIABLES =============#
 prefix = ''			# organism-specific abbreviation prepended to Allele Codes and data directories
 version = '2.1'		# current version of implementd algorithm
+codePrefix = ''		# what comes in front of every Allele Code, like: 'SALM2.1 - '; set once prefix is known
 configPath = ''		# path to core locus names config file
 coreLoci = []		# list of core locus names loaded from config file
 newAllelesPath = ''	# path to cgMLST allele profiles (tsv or csv); set at run time
@@ -54,7 +71,9 @@ thresholds = {'CAMP':[100.0*i/1343 for i in [84, 61, 24, 14, 5, 1]],	# [6.95%, 4
 defaultThresholds = [200, 150, 100, 50, 25, 1]
 minpres = 0.95	# minimum percent core called (i.e. total loci with alleles > 0)
 xCodeList = []	# list of Allele Codes whose within-code distance exceeds 4x the corresponding threshold
+xCodeTrie = {}	# xCodeList as nested dicts by digit, with (position in list, Xcode) under key None where an Xcode ends
 nosave = False	# whether or not to cancel overwriting files in data directory after processing
+compressLevel = DEFAULT_COMPRESS_LEVEL	# gzip compression level of allele calls files written to data directory
 verbose = False	# whether messages sent to log file will also be sent to terminal
 
 #============ DATA DIRECTORIES ============#
@@ -77,12 +96,38 @@ LOG_DIRS = ['change_log', 'Xcodes']
 
 
 #========= OPERATIONAL VARIABLES =========#
+# Lanes used to pack allele profiles into integers for distance calculation (see PackProfile)
+LANE_TYPE = 'I'							# array typecode of a single locus' lane
+LANE_BYTES = array(LANE_TYPE).itemsize	# bytes per lane
+LANE_TOP_BIT = LANE_BYTES*8 - 1			# position of the highest bit in a lane
+LANE_MAX = (1 << (LANE_BYTES*8)) - 1	# largest allele call a lane holds (calls outside 0-LANE_MAX are treated as missing)
+laneMask = 0							# packed profile with the lowest bit of every lane set; built once coreLoci are loaded
+laneLow = 0								# packed profile with every bit but the highest of every lane set; built with laneMask
+boundMask = 0							# all bits of the lanes checked by GetDistanceLowerBound; built once coreLoci are loaded
+boundLow = 0							# laneLow within boundMask
+profileBytes = 0						# total bytes of a packed profile; set once coreLoci are loaded
+boundBytes = 0							# total bytes of the lanes in boundMask; set once coreLoci are loaded
+
+# Most matrix.#.gzip blocks of allele profiles kept loaded at once (least recently used are dropped first)
+MATRIX_CACHE_SIZE = 64
+# Most packed allele profiles kept at once (least recently used are dropped first), as many as those blocks hold
+PACKED_CACHE_SIZE = MATRIX_CACHE_SIZE*1000
+
+# Intermittent saves of results: first after SAVE_INTERVAL named or changed entries, then after twice as many as
+# the time before (up to MAX_SAVE_INTERVAL), or sooner once SAVE_SECONDS have passed since the last save
+SAVE_INTERVAL = 1000
+MAX_SAVE_INTERVAL = 50000
+SAVE_SECONDS = 60
+
+# Dots in the progress bar shown while assigning names (one per 1/PROGRESS_WIDTH of profiles)
+PROGRESS_WIDTH = 20
+
 # Counter for how many distances have been calculated
 cntDistancesCalculated = 0
 
 # Variables to track changed codes
 numChanged = 0
-changedKeys = {}
+changedKeys = {}	# key:ChangeRow dict of Allele Codes changed this run
 
 #========== LOGGING FUNCTIONALITY ==========#
 # global logger:
@@ -106,6 +151,13 @@ def initialize_logging(log_dir):
 						datefmt='%m-%d-%Y %H:%M:%S',
 						filename=file_name,
 						level=logging.DEBUG)
+	
+	# log records only hold time and message (see format above), so skip gathering caller, thread,
+	# and process details for every one of them, as messages are logged for each profile
+	logging._srcfile = None
+	logging.logThreads = False
+	logging.logProcesses = False
+	logging.logMultiprocessing = False
 
 	Logger = logging.getLogger()
 
@@ -209,6 +261,52 @@ def Now():
 	"""
 	return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def DumpJson(obj):
+	"""
+	DumpJson:  serialize input object to compact JSON in one shot, using orjson if installed or json module otherwise
+		Arguments:
+			obj:  dict or list --> JSON-serializable object (non-string dict keys are written as strings)
+		Returns:
+			bytes
+	"""
+	if orjson is not None:
+		return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+	return json.dumps(obj, separators=(',', ':')).encode()
+
+def WriteJsonDict(obj, flobj, batchSize=10000):
+	"""
+	WriteJsonDict:  write input dict to input open file object as a single JSON object, serializing a batch of entries
+					at a time (with DumpJson), so large dicts aren't copied into memory whole before writing
+		Arguments:
+			obj:		dict --> JSON-serializable dict
+			flobj:		file object --> open binary stream to write JSON to
+			batchSize:	int --> total dict entries serialized at a time
+	"""
+	items = iter(obj.items())
+	separator = b''
+	flobj.write(b'{')
+	while True:
+		batch = dict(islice(items, batchSize))
+		if not batch:
+			break
+		# write batch's entries without its surrounding braces
+		flobj.write(separator)
+		flobj.write(DumpJson(batch)[1:-1])
+		separator = b','
+	flobj.write(b'}')
+
+def LoadJson(data):
+	"""
+	LoadJson:  deserialize input JSON, using orjson if installed or json module otherwise
+		Arguments:
+			data:  bytes or string --> JSON text
+		Returns:
+			dict or list
+	"""
+	if orjson is not None:
+		return orjson.loads(data)
+	return json.loads(data)
+
 def LoadProfilesFromFile(path):
 	"""
 	LoadProfilesFromFile: returns dictionary of profiles from input file (csv or tsv) in correct naming order
@@ -220,23 +318,53 @@ def LoadProfilesFromFile(path):
 	"""
 	profiles = {}
 	fields = []
-	# get raw values
-	with open(path, 'r') as f:
-		# load all profiles and headers into list of lists
-		content = [line.strip().split(delim) for line in f if len(line)]
+	# stream raw values through a large read buffer, one row at a time, using csv module's C tokenizer
+	# (splitting on delimiter only, as quotes have no special meaning in allele profiles)
+	with open(path, 'r', newline='', buffering=1<<20) as f:
+		# skip blank lines
+		rows = (row for row in csv.reader(f, delimiter=delim, quoting=csv.QUOTE_NONE) if len(row))
 		
 		# get field headings
-		fields = content[0][1:]
+		fields = [field.strip() for field in next(rows)[1:]]
+		nFields = len(fields)
 		
-		# convert profiles from lists to locus name:allele dict in profile dict
-		profiles = {content[i+1][0]:{fields[f]:int(content[i+1][f+1]) for f in range(len(fields))} for i in range(len(content[1:]))}
+		# map each locus in global coreloci list to its column once, pointing loci missing from the file
+		# at an extra '0' column appended to every row below
+		column = { field: i for i, field in enumerate(fields) }
+		colOrder = [column.get(locus, nFields) for locus in coreLoci]
 		
-		# convert profiles to lists in order of global coreloci list, filling in missing loci with allele 0
-		for k, (key, values) in enumerate(profiles.items()):
-			profiles[key] = [values.get(locus, 0) for locus in coreLoci]
+		for row in rows:
+			key = row[0].strip()
+			if not key:
+				continue
+			# one allele per field heading: ignore cells past the last heading (e.g. after a trailing delimiter),
+			# and count blank or absent cells as allele 0, before appending '0' column for missing loci
+			alleles = [allele.strip() or '0' for allele in row[1:nFields+1]]
+			alleles.extend(['0']*(nFields + 1 - len(alleles)))
+			# pick alleles straight into coreloci order, filling in missing loci with allele 0, converting them in bulk
+			calls = list(map(int, map(alleles.__getitem__, colOrder)))
+			# allele calls must fit in a lane to be packed for distance calculation (see PackProfile)
+			if min(calls, default=0) < 0 or max(calls, default=0) > LANE_MAX:
+				calls = ClearOutOfRangeCalls(key, calls)
+			profiles[key] = calls
 			
 	# return resulting dict
 	return profiles
+
+def ClearOutOfRangeCalls(key, calls):
+	"""
+	ClearOutOfRangeCalls:  log each allele call of input profile that can't be packed (negative or above LANE_MAX),
+							and return profile with those calls set to 0 (missing)
+		Arguments:
+			key:  	string --> key of allele profile
+			calls:  list[int] --> allele profile, in order of coreLoci
+		Returns:
+			list[int]
+	"""
+	for i, call in enumerate(calls):
+		if call < 0 or call > LANE_MAX:
+			log_error('Allele call {} of {} at locus {} is out of range (0-{}), so treated as missing'.format(call, key, coreLoci[i], LANE_MAX))
+	return [call if 0 <= call <= LANE_MAX else 0 for call in calls]
 	
 
 #====================== Xcode functionality ===========================#
@@ -246,7 +374,10 @@ def SetXcodeList(xCodeListPath):
 		Arguments:
 			xCodeListPath:  string --> path to Xcodes.tsv file
 	"""
-	global xCodeList
+	global xCodeList, xCodeTrie
+	xCodeTrie = {}
+	# forget names checked against any earlier Xcodes
+	CheckXcodeList.cache_clear()
 	if not os.path.exists(xCodeListPath):
 		# set xCodeList to empty list if no Xcodes.tsv file found
 		log_message("Xcodes.tsv file not found", depth=0)
@@ -265,39 +396,57 @@ def SetXcodeList(xCodeListPath):
 				xFileLines.pop(0)
 			
 			# set xCodeList to first index of tab-delimited lines of Xcode file
-			xCodeList = [line.split('\t')[0] for line in xFileLines]
+			# (without line ending, in case the file holds nothing else)
+			xCodeList = [line.rstrip('\r\n').split('\t')[0] for line in xFileLines]
+			
+			# and file it by digits, so names are looked up digit by digit rather than against every Xcode
+			for i, xCode in enumerate(xCodeList):
+				level = xCodeTrie
+				for digit in xCode.split('.'):
+					level = level.setdefault(digit, {})
+				# keep the first of any repeated Xcode
+				level.setdefault(None, (i, xCode))
 			
 	except:
 		# Log if an error happened loading Xcodes and set xCodeList to an empty list
 		log_message("Error processing Xcodes.tsv file.", depth=1)
 		xCodeList = []
+		xCodeTrie = {}
 		
+@lru_cache(maxsize=None)
 def CheckXcodeList(name):
 	"""
 	CheckXcodeList:  if input Allele Code matches a current Xcode up to one of its digits, then return that Xcode; return input Allele Code otherwise
+					(memoized, as many keys share an Allele Code; SetXcodeList clears it)
 		Arguments:
 			name:  string --> newly assigned Allele Code for assessment on X status
 		Returns:
 			string (either matching Xcode or input name if no matches found)
 	"""
-	# this is the length of what comes in front of the real name, like: 'SALM1.0 - '
-	l = len(prefix) + len(version) + 3
-	# trim that off and convert input name to a list
-	nameAsList = list(map(str, name[l:].split('.')))
-		
-	for xCode in xCodeList:
-		# skip if entry's name is shorter
-		if len(nameAsList) < len(xCode.split('.')):
-			continue
-		# if the name matches Xcode name, add an x to the end of it at the teriminal position of the Xcode
-		if '.'.join(nameAsList[:len(xCode.split('.'))]) == xCode:
-			return '{}{} - {}x'.format(prefix, version, xCode)
+	# trim off what comes in front of the real name, like: 'SALM1.0 - ', and convert input name to a list
+	nameAsList = name[len(codePrefix):].split('.')
+	
+	# follow the name's digits down xCodeTrie, keeping the earliest listed Xcode that the name starts with
+	match = None
+	level = xCodeTrie
+	for digit in nameAsList:
+		level = level.get(digit)
+		if level is None:
+			break
+		found = level.get(None)
+		if found is not None and (match is None or found < match):
+			match = found
+	
+	# if the name matches Xcode name, add an x to the end of it at the teriminal position of the Xcode
+	if match is not None:
+		return '{}{}x'.format(codePrefix, match[1])
 	
 	# return input name otherwise
 	return name
 	
 #====================== Class definitions =============================#
 Cluster = namedtuple('Cluster', ['id', 'members', 'diameter', 'preferred'])
+ChangeRow = namedtuple('ChangeRow', ['key', 'old', 'new', 'kind'])	# changed Allele Code, as written to change_log file
 
 class Tree(object):
 	"""
@@ -313,8 +462,8 @@ class Tree(object):
 		Tree.CURRENT = self					# self reference
 		Tree.DEPTH = depth					# total number of digits in full-length Allele Code
 		self._tree = Node(1, 0, None)		# initial empty node of any Tree
-		self._names = defaultdict(list)		# full-length Allele Code that will hold the finalized name at the end
-		self._oldNames = defaultdict(list)	# full-length Allele Code before naming begins (used to track changed codes)
+		self._names = {}					# full-length Allele Code (tuple of ints) that will hold the finalized name at the end
+		self._oldNames = {}					# full-length Allele Code before naming begins (used to track changed codes)
 		self._treeHasBeenBuilt = False		# check for tree building status
 	
 	@staticmethod
@@ -322,30 +471,28 @@ class Tree(object):
 		"""
 		CDCName:  prepend appropriate suffix and version to name list converted to string
 			Arguments:
-				part:	list[int] --> partial Allele Code
+				part:	tuple/list[int] --> partial Allele Code
 			Returns:
 				string (concatenated input Allele Code (part) prepended with user-supplied prefix and built-in version)
 		"""
-		# verify input is a list
-		if not isinstance(part, list):
-			raise AssertionError('Need list to create code!')
-		# add prefix and version onto dot-separated name and return it
-		code = '{}{} - {}'.format(prefix, version, Tree.NameToStr(part))
-		return code
+		# verify input is a tuple or list (debug runs only, as with any assert)
+		assert isinstance(part, (tuple, list)), 'Need tuple or list to create code!'
+		# add prefix and version (precomputed codePrefix) onto dot-separated name and return it
+		return codePrefix + '.'.join(map(str, part))
 
 	def FinalizeName(self, key, name):
 		"""
-		FinalizeName:  set input key's name (list) to input name (list)
+		FinalizeName:  set input key's name (tuple) to input name (tuple or list)
 			Arguments:
 				key:	string
-				name:	list[int]
+				name:	tuple/list[int] --> a tuple is stored as is (e.g. NamedNode.Code(), shared by the node's keys)
 		"""
 		# get node corresponding to input name list
 		node = self.Traverse(name)
 		# verify input key has been named
 		assert(node.IsNamed(key))
-		# set the key's name to input name in self._names
-		self._names[key] = name
+		# set the key's name to input name in self._names, as a tuple, since names only change by being replaced
+		self._names[key] = tuple(name)
 
 	def FinalizeCDCNames(self):
 		"""
@@ -373,30 +520,30 @@ class Tree(object):
 
 	def GetName(self, key):
 		"""
-		GetName:  return Allele Code for input key as list of ints, or empty list if not in self._names dict
+		GetName:  return Allele Code for input key as tuple of ints, or empty tuple if not in self._names dict
 			Arguments:
 				key:  string
 			Returns:
-				list (Allele Code for input key as list of ints)
+				tuple (Allele Code for input key as tuple of ints)
 		"""
-		return self._names.setdefault(key, [])
+		return self._names.get(key, ())
 
 	def GetNames(self):
 		"""
 		GetNames:  return self._names (dict)
 			Returns:
-				dict ({key:[int, int, int, ...]...})
+				dict ({key:(int, int, int, ...)...})
 		"""
 		return self._names
 
 	def GetPart(self, key, level):
 		"""
-		GetPart:  return input key's Allele Code as list up to input digit number (level)
+		GetPart:  return input key's Allele Code as tuple up to input digit number (level)
 			Arguments:
 				key:	string
 				level:	int
 			Returns:
-				list
+				tuple
 		"""
 		return self.GetName(key)[:level]
 
@@ -427,14 +574,14 @@ class Tree(object):
 				flobj: file object --> open file object for reading
 		"""
 		# read file into dictionary and verify type
-		database = json.load(flobj)
+		database = LoadJson(flobj.read())
 		assert isinstance(database, dict)
 		# construct self._tree using Node.Load constructor
 		self._tree = Node.Load(None, database['tree'], self.DEPTH)
 		# update member variables with tree file contents
 		self._treeHasBeenBuilt=True
-		self._names.update(database['names'])
-		self._oldNames.update(database['names'])
+		self._names.update((key, tuple(name)) for key, name in database['names'].items())
+		self._oldNames.update(self._names)
 		
 	@staticmethod
 	def NameToStr(parts):
@@ -446,9 +593,9 @@ class Tree(object):
 				string (dot-separated string of concatenated input integer list items)
 		"""
 		# make sure input is an iterable (list or tuple)
-		assert(isinstance(parts, list) or isinstance(parts, tuple))
+		assert isinstance(parts, (list, tuple))
 		# return concatenated digits separated by dots ('.')
-		return '.'.join(list(map(str, parts)))
+		return '.'.join(map(str, parts))
 
 	@staticmethod
 	def NameFromStr(name):
@@ -485,8 +632,7 @@ class Tree(object):
 			print(name)
 		
 		# verify input prefix+version prependage is what it should be
-		codePrefix = '{}{} - '.format(prefix, version)
-		if name[:len(codePrefix)]!=codePrefix:
+		if not name.startswith(codePrefix):
 			# return empty list if not
 			return []
 		
@@ -501,7 +647,11 @@ class Tree(object):
 				key:	 string --> old key to replace
 				newKey:  string --> key to replace the old one with
 		"""
-		# get full-length Allele Code of input key as list
+		# nothing to replace if keys are the same
+		if key == newKey:
+			return
+		
+		# get full-length Allele Code of input key as tuple
 		location = self._names.get(key, None)
 		if location is not None:
 			if self._treeHasBeenBuilt:
@@ -529,16 +679,15 @@ class Tree(object):
 					parent = child
 					
 			# Lastly, replace the key in the names dict
-			self._names[newKey] = self._names[key]
-			del self._names[key]
+			self._names[newKey] = self._names.pop(key)
 	
 	def Save(self, flobj):
 		"""
 		Save:  write {'names':{}, 'tree':{}} dict into input open file object
 			Arguments:
-				flobj:  file object --> open stream to write data to file
+				flobj:  file object --> open binary stream to write data to file
 		"""
-		json.dump({ 'names': self._names, 'tree': self._tree.Save() }, flobj)
+		flobj.write(DumpJson({ 'names': self._names, 'tree': self._tree.Save() }))
 
 	def Traverse(self, ids):
 		"""
@@ -572,6 +721,10 @@ class Node(object):
 	"""
 	Node:  base class for elements managed in Tree class to hold hierarchical naming structure
 	"""
+	# fixed member variables (no per-instance __dict__), as trees hold many thousands of nodes
+	__slots__ = ('_ID', '_level', '_parent', '_children', '_nextChildId', '_diameter', '_preferred',
+					'_entryKeys', '_entryKeysSet', '_founderDistances')
+	
 	def __init__(self, ID, level, parent):
 		"""
 		Initialize with input variables and empty/0/None objects
@@ -580,11 +733,14 @@ class Node(object):
 		self._level = level		# digit/position in period-separated code
 		self._parent = parent	# parent node
 		self._children = {}		# child nodes
+		self._nextChildId = 1	# ID for next new child node (one greater than max child ID)
 		self._diameter = 0		# maximum weighted distance between profiles in node
 		self._preferred = None	# founder/initiator Key
 		
 		#for caching purposes only!
-		self._entryKeys = None
+		self._entryKeys = None		# list of keys at or below node, for iteration
+		self._entryKeysSet = None	# set of the same keys, for membership tests
+		self._founderDistances = None	# distances of keys (in node, or other founders) to founder, for pruning comparisons
 		
 	@property
 	def Diameter(self):
@@ -620,7 +776,21 @@ class Node(object):
 			Arguments:
 				preferred:  string --> founder key for Node
 		"""
+		# distances cached against the old founder no longer apply
+		if preferred != self._preferred:
+			self._founderDistances = None
 		self._preferred = preferred
+	
+	@property
+	def FounderDistances(self):
+		"""
+		FounderDistances:  return self._founderDistances dict (key --> distance to Preferred), empty if none cached yet
+			Returns:
+				dict (self._founderDistances)
+		"""
+		if self._founderDistances is None:
+			self._founderDistances = {}
+		return self._founderDistances
 		
 	@property
 	def EntryKeys(self):
@@ -631,6 +801,7 @@ class Node(object):
 		"""
 		if self._entryKeys is None:
 			self._entryKeys = list(self.iter_entrykeys())
+			self._entryKeysSet = set(self._entryKeys)
 		return self._entryKeys
 		
 	@EntryKeys.setter
@@ -641,6 +812,30 @@ class Node(object):
 				entryKeys:  list[string] --> list of keys to add to Node's _entryKeys list
 		"""
 		self._entryKeys = entryKeys
+		self._entryKeysSet = None if entryKeys is None else set(entryKeys)
+	
+	def _AddEntryKey(self, key):
+		"""
+		_AddEntryKey:  add input key to cached EntryKeys of self and every ancestor Node that has them cached already
+			Arguments:
+				key:  string --> key newly named at or below self Node
+		"""
+		node = self
+		while node is not None:
+			if node._entryKeys is not None and key not in node._entryKeysSet:
+				node._entryKeys.append(key)
+				node._entryKeysSet.add(key)
+			node = node._parent
+	
+	def _InvalidateEntryKeys(self):
+		"""
+		_InvalidateEntryKeys:  clear cached EntryKeys of self and every ancestor Node, so they are rebuilt on next use
+		"""
+		node = self
+		while node is not None:
+			node._entryKeys = None
+			node._entryKeysSet = None
+			node = node._parent
 		
 	def Save(self):
 		"""
@@ -648,22 +843,38 @@ class Node(object):
 			Returns:
 				dict (dictionary containing current Node variables with child Node variables nested in 'children' dict)
 		"""
-		# initialize 'info' dict for current Node, recursing for all child Nodes found
+		# initialize 'info' dict for current Node, then fill in all Nodes below it top-down
+		# using an explicit stack rather than recursion
+		info = self._Info()
+		toSave = [(self, info)]
+		while toSave:
+			node, nodeInfo = toSave.pop()
+			children = nodeInfo['children']
+			for childId, child in node._children.items():
+				children[childId] = child._Info()
+				toSave.append((child, children[childId]))
+		
+		# return top-down compiled info for Node
+		return info
+	
+	def _Info(self):
+		"""
+		_Info:  return dictionary of member variables for Save function, with an empty 'children' dict to fill in
+			Returns:
+				dict
+		"""
 		info = {
 			'ID': self._ID,
 			'level': self._level,
 			'diameter': self._diameter,
 			'preferred': self._preferred,
-			'children': { childId: 
-				child.Save() for childId, child in self._children.items()
-			}
+			'children': {}
 		}
 		# if current Node is a NamedNode, _Save will add 'details' into the info dict, so add it here
 		detailedInfo = self._Save()
 		if detailedInfo:
 			info['details'] = detailedInfo
 		
-		# return top-down compiled info for Node
 		return info
 	
 	@staticmethod
@@ -678,6 +889,34 @@ class Node(object):
 				Node (new Node created by GetNode function then filled in here)
 		"""
 		# create new Node using input args
+		node = Node._FromInfo(parent, info, depth)
+		
+		# then create all Nodes below it top-down (parents before children, as NamedNodes need
+		# their full path on creation) using an explicit stack rather than recursion
+		toLoad = [(node, info)]
+		while toLoad:
+			parentNode, parentInfo = toLoad.pop()
+			for childId, childInfo in parentInfo['children'].items():
+				child = Node._FromInfo(parentNode, childInfo, depth)
+				parentNode._children[int(childId)] = child
+				toLoad.append((child, childInfo))
+			parentNode._nextChildId = max(parentNode._children, default=0) + 1
+		
+		# return new, completed Node
+		return node
+	
+	@staticmethod
+	def _FromInfo(parent, info, depth):
+		"""
+		_FromInfo:  create new Node (GetNode function) without children, and set variables according to input info dict
+			Arguments:
+				parent:  Node --> parent Node to use for GetNode function
+				info:	 dict --> dictionary with Node-specific Keys for filling new Node's values
+				dept:	 int --> integer for GetNode function to create a new Node
+			Returns:
+				Node
+		"""
+		# create new Node using input args
 		node = GetNode(info['ID'], info['level'], parent, depth)
 		# set new Node's variables
 		node._diameter = info['diameter']
@@ -685,9 +924,7 @@ class Node(object):
 		if 'details' in info:
 			# if 'details' is a Key in info dict, it's a NamedNode, so run _Load function
 			node._Load(info['details'])
-		node._children = { int(childId): Node.Load(node, childInfo, depth) for childId, childInfo in info['children'].items() }
 		
-		# return new, completed Node
 		return node
 	
 	def _Save(self):
@@ -715,6 +952,10 @@ class Node(object):
 		node.SetParent(self)
 		# add input node to self._children under input ID
 		self._children[ID] = node
+		if ID >= self._nextChildId:
+			self._nextChildId = ID + 1
+		# keys below self have changed
+		self._InvalidateEntryKeys()
 
 	def DeleteChild(self, ID):
 		"""
@@ -723,6 +964,11 @@ class Node(object):
 				ID:  int
 		"""
 		del self._children[ID]
+		# free up max child ID for the next new child node, as it's no longer taken
+		if ID == self._nextChildId - 1:
+			self._nextChildId = max(self._children, default=0) + 1
+		# keys below self have changed
+		self._InvalidateEntryKeys()
 
 	def DFSNamed(self):
 		"""
@@ -730,21 +976,21 @@ class Node(object):
 			Returns:
 				NamedNode as iterator
 		"""
-		if isinstance(self, NamedNode):
+		if type(self) is NamedNode:
 			# if already at a NamedNode, return self and stop
 			yield self
 		else:
-			# otherwise, yield all child nodes that are NamedNodes
-			toCheck = list(self.GetChildrenNodes())
+			# otherwise, yield all child nodes that are NamedNodes, using a single explicit stack
+			toCheck = list(self._children.values())
 
-			while(len(toCheck)):
+			while toCheck:
 				ob = toCheck.pop()
-				if isinstance(ob, NamedNode):
+				if type(ob) is NamedNode:
 					# if this child Node is a NamedNode, yield it
 					yield ob
 				else:
-					# otherwise, add its child Nodes to list to keep it going
-					toCheck.extend(ob.GetChildrenNodes())
+					# otherwise, add its child Nodes to stack to keep it going
+					toCheck.extend(ob._children.values())
 					
 	def iter_entrykeys(self):
 		"""
@@ -813,13 +1059,9 @@ class Node(object):
 			Returns:
 				Node (new node if current level isn't within 1 of tree depth; new NamedNode otherwise if it is)
 		"""
-		# determine new Node's ID
-		if not len(self._children):
-			# if no other children, then new node ID is 1
-			nextCluster = 1
-		else:
-			# otherwise, it's the max ID of existing children plus 1
-			nextCluster = max(self._children.keys()) + 1
+		# determine new Node's ID (1 if no other children, max ID of existing children plus 1 otherwise)
+		nextCluster = self._nextChildId
+		self._nextChildId += 1
 		
 		if self._level == Tree.DEPTH - 1:
 			# add as NamedNode if current node is penultimate
@@ -861,7 +1103,7 @@ class Node(object):
 				self.DeleteChild(node.ID())
 		else:
 			# rename smaller nodes to next largest integers after largest node's ID
-			toStart = max(maxObj.GetChildrenKeys()) + 1
+			toStart = maxObj._nextChildId
 			for node in minObjs:
 				for i, child in enumerate(node.GetChildrenNodes(), toStart):
 					child.SetID(i)
@@ -872,9 +1114,11 @@ class Node(object):
 				self.DeleteChild(node.ID())
 		# update Allele Codes for all keys in combined Node
 		for node in maxObj.DFSNamed():
-			wgst = node.ValidateNames()
+			node.ValidateNames()
+			# all keys share the node's code tuple
+			code = node.Code()
 			for key in node.GetNamedChildren():
-				Tree.CURRENT.FinalizeName(key, wgst)
+				Tree.CURRENT.FinalizeName(key, code)
 				
 		# return Node resulting from merge
 		return maxObj
@@ -921,16 +1165,14 @@ class Node(object):
 			Returns:
 				Node (None if none exist)
 		"""
-		if len(ids) == 1:
-			return self.GetChild(ids[0])
-		
-		else:
-			child = self.GetChild(ids[0])
-			
-			if child:
-				return child.Traverse(ids[1:])
-			else:
+		# walk down one child per digit, without recursing or slicing input ids
+		node = self
+		for ID in ids:
+			node = node._children.get(ID, None)
+			if node is None:
 				return None
+		
+		return node
 
 	def NTraverse(self):
 		"""
@@ -938,19 +1180,18 @@ class Node(object):
 			Returns:
 				list[ints]
 		"""
-		if self._parent == None:
-			# parent Node doesn't exist, so
-			if self.TotalChildCount() == 1:
-				# return [-1] if head node of entire tree
-				return [-1]
-			else:
-				# return Node ID otherwise
-				return [self.ID()]
-		else:
-			if self.TotalChildCount() == 1:
-				return [-1] + self._parent.NTraverse()
+		# walk up to the head node of entire tree, adding -1 for each Node with a single child
+		# and Node ID otherwise
+		ids = []
+		node = self
+		while node is not None:
+			if node.TotalChildCount() == 1:
+				ids.append(-1)
 			else:
-				return [ self.ID() ] + self._parent.NTraverse()
+				ids.append(node._ID)
+			node = node._parent
+		
+		return ids
 
 	def RTraverse(self):
 		"""
@@ -958,10 +1199,14 @@ class Node(object):
 			Returns:
 				list[ints]
 		"""
-		if self._parent == None:
-			return []
-		else:
-			return [self._ID] + self._parent.RTraverse()
+		# walk up the parent chain, skipping the head node (which has no parent)
+		ids = []
+		node = self
+		while node._parent is not None:
+			ids.append(node._ID)
+			node = node._parent
+		
+		return ids
 
 	def __repr__(self):
 		"""
@@ -977,17 +1222,21 @@ class Node(object):
 
 class NamedNode(Node):
 	"""
-	NamedNode:  class inheriting Node elements with added _namedChildren dict to hold corresponding keys with full-length code, 
+	NamedNode:  class inheriting Node elements with added _namedChildren to hold keys sharing its full-length code, 
 				should more than one key be present here
 	"""
+	__slots__ = ('_wgst', '_code', '_namedChildren')
 	
 	def __init__(self, ID, level, parent):
 		"""
 		Initialize class using parent class Node constructor followed by additional variables
 		"""
 		super(self.__class__, self).__init__(ID, level, parent)	# Node constructor creating ID and level elements with parent input Node
-		self._wgst = self.RTraverse()[-1::-1]					# list of ints, representing the full-length Allele Code at this node
-		self._namedChildren = {}								# empty dict to hold keys contained in this Node
+		self._wgst = self.RTraverse()							# list of ints, representing the full-length Allele Code at this node
+		self._wgst.reverse()									# (RTraverse lists IDs from this node up, so reverse in place)
+		self._code = None										# self._wgst as a tuple, shared by names of all keys in this Node
+		self._namedChildren = {}								# keys contained in this Node (no values), in the order added
+		# (a dict rather than a set, so keys are always iterated, saved and output in the same order)
 		
 	def _Save(self):
 		"""
@@ -999,11 +1248,11 @@ class NamedNode(Node):
 		
 	def _Load(self, info):
 		"""
-		_Load:  set self._namedChildren equal to {key:self._wgst...} for every key in input info dict
+		_Load:  set self._namedChildren to every key in input info dict
 			Arguments:
 				info:  dict --> json "info" element of saved tree file
 		"""
-		self._namedChildren = { key: self._wgst for key in info['namedChildren'] }
+		self._namedChildren = dict.fromkeys(info['namedChildren'])
 		
 	def AddNamedChild(self, key):
 		"""
@@ -1013,8 +1262,10 @@ class NamedNode(Node):
 			Returns:
 				list of ints
 		"""
-		self._namedChildren[key] = self._wgst
-		return self.GetChildName(key)
+		self._namedChildren[key] = None
+		# keep cached EntryKeys up the tree current
+		self._AddEntryKey(key)
+		return self._wgst
 	
 	def GetChildName(self, key):
 		"""
@@ -1022,11 +1273,11 @@ class NamedNode(Node):
 			Returns:
 				list of ints
 		"""
-		return self._namedChildren.get(key, None)
+		return self._wgst if key in self._namedChildren else None
 
 	def GetNamedChildren(self):
 		"""
-		GetNamedChildren:  return self._namedChildren dictionary
+		GetNamedChildren:  return self._namedChildren dictionary (iterate for keys)
 			Returns:
 				dict
 		"""
@@ -1057,10 +1308,8 @@ class NamedNode(Node):
 				key:  	string --> key to replace
 				newKey: string --> replacement key
 		"""
-		# add newKey to self._namedChildren in old key's placed
-		self._namedChildren[newKey] = self._namedChildren[key]
-		# and delete old key from self._namedChildren
-		del self._namedChildren[ key ]
+		# move old key's entry in self._namedChildren over to newKey
+		self._namedChildren[newKey] = self._namedChildren.pop(key)
 
 	def ValidateNames(self):
 		"""
@@ -1068,8 +1317,12 @@ class NamedNode(Node):
 			Returns:
 				list of ints
 		"""
-		for i, val in enumerate(self.RTraverse()[-1::-1]):
-			self._wgst[i] = val
+		# update digits in place from RTraverse (listed from this node up), as self._wgst is handed out as node's code
+		ids = self.RTraverse()
+		ids.reverse()
+		self._wgst[:] = ids
+		# digits may have changed, so rebuild tuple when next needed
+		self._code = None
 
 		return self._wgst
 
@@ -1078,6 +1331,16 @@ class NamedNode(Node):
 		Address:  return node's code
 		"""
 		return self._wgst
+	
+	def Code(self):
+		"""
+		Code:  return node's code as a tuple, built once and reused until ValidateNames updates the code
+			Returns:
+				tuple of ints
+		"""
+		if self._code is None:
+			self._code = tuple(self._wgst)
+		return self._code
 
 
 def GetNode(ID, level, parent, depth):
@@ -1106,7 +1369,12 @@ class AlleleCalls(object):
 		"""
 		self._alleleCalls = {}	# key:profile dict holding allele calls in order specified by coreLoci[] list at top
 		self._index = {}		# key:# dict, where # indicates the matrix.#.gzip file holding the corresponding allele profile
-		self._matrices = []		# profiles loaded from various matrix.#.gzip files
+		self._matrices = OrderedDict()	# #:profiles dict of matrix.#.gzip files used most recently, oldest first
+		self._nMatrices = 0				# total matrix.#.gzip files
+		self._loading = {}				# #:future dict of matrix.#.gzip files being read ahead in the background
+		self._loader = None				# single-thread executor doing the reading ahead, started on first use
+		self._packed = OrderedDict()	# key:(packed profile, called loci) of profiles used most recently for distance
+										# calculation (see PackProfile and FoldLanes), oldest first
 		
 	def _Convert(self):
 		"""
@@ -1116,6 +1384,9 @@ class AlleleCalls(object):
 		# total number of profiles to write to file
 		BLOCKSIZE = 1000
 		
+		# matrices newly gathered below, to be written to file together at the end
+		toSave = []
+		
 		while len(self._alleleCalls)>BLOCKSIZE:
 			keys = list(self._alleleCalls.keys())
 			matrix = {}
@@ -1123,17 +1394,44 @@ class AlleleCalls(object):
 			for i, key in enumerate(keys[:BLOCKSIZE]):
 				# add allele profile to matrix dict
 				matrix[key] = self._alleleCalls[key]
-				# and its position in self._matrices to self._index
-				self._index[key] = (len(self._matrices), i)
+				# and its matrix file number and position to self._index
+				self._index[key] = (self._nMatrices, i)
 				# then delete from self._alleleCalls
 				del self._alleleCalls[key]
 				
-			# append 1000-key matrix to self._matrices
-			self._matrices.append(matrix)
-			
-			# write 1000-key matrix to matrix.#.gzip file, where # is the current length of self._matrices minus 1
-			with gzip.open(os.path.join(self._path, 'matrix.{}.gzip'.format(len(self._matrices)-1)), 'wb') as flobj:
-				flobj.write(str(matrix).replace("'", '"').encode())
+			# keep 1000-key matrix in self._matrices under the next matrix file number
+			self._CacheMatrix(self._nMatrices, matrix)
+			toSave.append((self._nMatrices, matrix))
+			self._nMatrices += 1
+		
+		if toSave:
+			# compress matrix files in parallel threads (zlib releases the GIL while compressing), each to its own file;
+			# going through the results re-raises any error writing them
+			with ThreadPoolExecutor(max_workers=min(len(toSave), max(1, (os.cpu_count() or 1)//2))) as pool:
+				list(pool.map(self._SaveMatrix, *zip(*toSave)))
+	
+	def _SaveMatrix(self, i, matrix):
+		"""
+		_SaveMatrix:  write input matrix to matrix.[i].gzip
+			Arguments:
+				i:  	 integer --> name in the middle of matrix.[i].gzip file
+				matrix:  dict --> key:profile dict of allele calls to write
+		"""
+		with gzip.open(os.path.join(self._path, 'matrix.{}.gzip'.format(i)), 'wb', compresslevel=compressLevel) as flobj:
+			flobj.write(DumpJson(matrix))
+	
+	def _CacheMatrix(self, i, matrix):
+		"""
+		_CacheMatrix:  keep input matrix in self._matrices as the most recently used, dropping the least recently used
+						matrices beyond MATRIX_CACHE_SIZE (they're already saved, so can be loaded again if needed)
+			Arguments:
+				i:  	 integer --> name in the middle of matrix.[i].gzip file
+				matrix:  dict --> key:profile dict of allele calls in that file
+		"""
+		self._matrices[i] = matrix
+		self._matrices.move_to_end(i)
+		while len(self._matrices) > MATRIX_CACHE_SIZE:
+			self._matrices.popitem(last=False)
 				
 	def Load(self, path):
 		"""
@@ -1148,7 +1446,7 @@ class AlleleCalls(object):
 		flName = os.path.join(path, 'calls.gzip')
 		if os.path.exists(flName):
 			with gzip.open(flName, 'rb') as flobj:
-				content = json.load(flobj)
+				content = LoadJson(flobj.read())
 				# then convert allele profiles to list of ints when loading into self._alleleCalls
 				for key, profile in content.items():
 					self._alleleCalls[key] = list(map(int, profile))
@@ -1157,23 +1455,60 @@ class AlleleCalls(object):
 		flName = os.path.join(path, 'index.gzip')
 		if os.path.exists(flName):
 			with gzip.open(flName, 'rb') as flobj:
-				self._index = json.load(flobj)
+				self._index = LoadJson(flobj.read())
 				
-		self._matrices = []
+		self._matrices = OrderedDict()
+		self._loading = {}
+		# matrix files are numbered in order, so new ones continue after the highest in the index
+		self._nMatrices = 1 + max((idx[0] for idx in self._index.values()), default=-1)
+		self._packed = OrderedDict()
 	
-	def _LoadMatrix(self, i):
+	def _ReadMatrix(self, i):
 		"""
-		_LoadMatrix: read matrix.[i].gzip into self._matrices[i]
+		_ReadMatrix: read and return profiles saved in matrix.[i].gzip file
 			Arguments:
 				i:  integer --> name in the middle of saved matrix.[i].gzip file, holding saved allele calls
+			Returns:
+				dict (key:profile)
 		"""
-		# make self._matrices at least as long as input i
-		while len(self._matrices) <=i:
-			self._matrices.append(None)
-			
-		# read matrix.i.gzip ito self._matrices[i]
 		with gzip.open(os.path.join(self._path, 'matrix.{}.gzip'.format(i)), 'rb') as flobj:
-			self._matrices[i] = json.load(flobj)
+			return LoadJson(flobj.read())
+	
+	def _Prefetch(self, i):
+		"""
+		_Prefetch: start reading matrix.[i].gzip in the background, if it exists and is neither cached nor already being read,
+					in place of any other being read
+			Arguments:
+				i:  integer --> name in the middle of saved matrix.[i].gzip file, holding saved allele calls
+		"""
+		if i >= self._nMatrices or i in self._matrices or i in self._loading:
+			return
+		if self._loader is None:
+			self._loader = ThreadPoolExecutor(max_workers=1)
+		# read only one ahead at a time: one not taken by now wasn't wanted next, so drop it (cancelling it if not
+		# started) rather than keep its profiles outside of MATRIX_CACHE_SIZE
+		for future in self._loading.values():
+			future.cancel()
+		self._loading = { i: self._loader.submit(self._ReadMatrix, i) }
+	
+	def _GetMatrix(self, i):
+		"""
+		_GetMatrix: return matrix.[i].gzip profiles from self._matrices, reading file into it first if not there
+			Arguments:
+				i:  integer --> name in the middle of saved matrix.[i].gzip file, holding saved allele calls
+			Returns:
+				dict (key:profile)
+		"""
+		matrix = self._matrices.get(i, None)
+		if matrix is None:
+			# take matrix.i.gzip from the background read if one was started, or read it now
+			future = self._loading.pop(i, None)
+			matrix = future.result() if future is not None else self._ReadMatrix(i)
+			# matrix files fill in naming order, so the next one is likely wanted soon:
+			# decompress it while distances are calculated with this one
+			self._Prefetch(i + 1)
+		self._CacheMatrix(i, matrix)
+		return matrix
 	
 	def Save(self, path):
 		"""
@@ -1192,13 +1527,13 @@ class AlleleCalls(object):
 		for key, profile in self._alleleCalls.items():
 			self._alleleCalls[key] = list(profile)
 		
-		# and write to calls.gzip file, converting self._alleleCalls dict to byte-encoded, jason-serializable string
-		with gzip.open(os.path.join(path, 'calls.gzip'), 'wb') as flobj:
-			flobj.write(str(self._alleleCalls).replace("'", '"').encode())
+		# and write to calls.gzip file, serializing self._alleleCalls dict straight to JSON bytes
+		with gzip.open(os.path.join(path, 'calls.gzip'), 'wb', compresslevel=compressLevel) as flobj:
+			flobj.write(DumpJson(self._alleleCalls))
 		
-		# save the index to file too, converting as with self._alleleCalls above
-		with gzip.open(os.path.join(path, 'index.gzip'), 'wb') as flobj:
-			flobj.write(str(self._index).replace("'", '"').encode())
+		# save the index to file too, a batch of keys at a time, as it holds every key in the matrix files
+		with gzip.open(os.path.join(path, 'index.gzip'), 'wb', compresslevel=compressLevel) as flobj:
+			WriteJsonDict(self._index, flobj)
 			
 	def Add(self, key, calls):
 		"""
@@ -1223,14 +1558,51 @@ class AlleleCalls(object):
 		"""
 		idx = self._index.get(key, None)
 		if idx:
-			if idx[0] >= len(self._matrices) or self._matrices[idx[0]] is None:
-				# if input key's allele profile isn't loaded yet, load the matrix file corresponding to it
-				self._LoadMatrix(idx[0])
-				
-			return self._matrices[idx[0]][idx[1]]
+			# get matrix holding input key's allele profile, loading it if it isn't loaded (anymore)
+			return self._GetMatrix(idx[0])[key]
 		
 		return self._alleleCalls.get(key, None)
 
+	def GetPackedCalls(self, key):
+		"""
+		GetPackedCalls:  return allele calls for input key packed into an integer (see PackProfile), packing them on first use
+			Arguments:
+				key:  string
+			Returns:
+				int
+		"""
+		return self.GetPackedLanes(key)[0]
+
+	def GetPresentLanes(self, key):
+		"""
+		GetPresentLanes:  return lowest bit set in each lane of the packed allele calls for input key that is called (> 0),
+							folded once when packed, as each profile is compared to many others
+			Arguments:
+				key:  string
+			Returns:
+				int
+		"""
+		return self.GetPackedLanes(key)[1]
+	
+	def GetPackedLanes(self, key):
+		"""
+		GetPackedLanes:  return both GetPackedCalls and GetPresentLanes for input key, from self._packed as the most recently
+							used, packing allele calls first if not there and dropping the least recently used beyond PACKED_CACHE_SIZE
+			Arguments:
+				key:  string
+			Returns:
+				tuple (int, int)
+		"""
+		packed = self._packed.get(key, None)
+		if packed is None:
+			calls = PackProfile(self.GetCalls(key))
+			packed = self._packed[key] = (calls, FoldLanes(calls))
+			if len(self._packed) > PACKED_CACHE_SIZE:
+				self._packed.popitem(last=False)
+		else:
+			self._packed.move_to_end(key)
+		return packed
+
 	def HasKey(self, key):
 		"""
 		HasKey:  return whether input key is in either _index or _alleleCalls dictionaries
@@ -1245,13 +1617,133 @@ class AlleleCalls(object):
 		return len(self._alleleCalls) + len(self._index)
 
 
-def GetDistance(p1, p2):
+class SharedDistances(object):
+	"""
+	SharedDistances:  class to hand distances calculated for a new profile on to later new profiles with identical allele calls
+						(distance only depends on the allele calls themselves), holding each only until the last of those takes it
+	"""
+	def __init__(self, profiles):
+		"""
+		Initialize class with first key of each group of identical input profiles (dict of key:[alleles])
+		"""
+		self._firstKeyOf = {}			# key:first key with identical profile, for all but first keys
+		self._remaining = Counter()		# first key:total identical profiles yet to take its distances
+		self._distances = {}			# first key:distances to named keys (array('d'), see CalcName)
+		firstKeys = {}
+		for key, calls in profiles.items():
+			firstKey = firstKeys.setdefault(tuple(calls), key)
+			if firstKey != key:
+				self._firstKeyOf[key] = firstKey
+				self._remaining[firstKey] += 1
+	
+	def Take(self, key):
+		"""
+		Take:  return distances dict to start naming input key from, holding distances of first identical profile if kept,
+				and drop those once no other identical profile is left to take them
+			Arguments:
+				key:  string --> key of new allele profile about to be named
+			Returns:
+				dict ({key:array('d')} or empty)
+		"""
+		firstKey = self._firstKeyOf.pop(key, None)
+		if firstKey is None:
+			return {}
+		self._remaining[firstKey] -= 1
+		if self._remaining[firstKey]:
+			distances = self._distances.get(firstKey)
+		else:
+			del self._remaining[firstKey]
+			distances = self._distances.pop(firstKey, None)
+		return {} if distances is None else { key: distances }
+	
+	def Keep(self, key, distances):
+		"""
+		Keep:  hold on to input key's distances from input distances dict (filled in by CalcName), if identical profiles follow
+			Arguments:
+				key:		string --> key of new allele profile just named
+				distances:	dict --> {key:array('d')...} distances passed to CalcName
+		"""
+		if self._remaining.get(key) and key in distances:
+			self._distances[key] = distances[key]
+	
+	def __len__(self):
+		return len(self._distances)
+
+
+#===================== Packed profile functionality ===========================#
+def SetCoreLoci(loci):
+	"""
+	SetCoreLoci:  set global coreLoci list, and the masks and sizes of packed profiles built from it
+		Arguments:
+			loci:  list --> core locus names, in order allele profiles are kept
+	"""
+	global coreLoci, laneMask, laneLow, boundBytes, boundMask, boundLow, profileBytes
+	coreLoci = loci
+	# lowest bit of every locus' lane, for distance calculation between packed profiles
+	laneMask = PackProfile([1]*len(coreLoci))
+	laneLow = laneMask * ((1 << LANE_TOP_BIT) - 1)
+	# and all bits of the first quarter of them, for ruling out far-off profiles (see GetDistanceLowerBound)
+	boundBytes = LANE_BYTES*(len(coreLoci)//4)
+	boundMask = (1 << (8*boundBytes)) - 1
+	boundLow = laneLow & boundMask
+	profileBytes = LANE_BYTES*len(coreLoci)
+
+def PackProfile(calls):
+	"""
+	PackProfile:  pack input allele profile into a single integer holding one fixed-width lane (LANE_TYPE) per locus,
+					so profiles can be compared with a few C-level big-integer operations instead of a loop over every locus
+		Arguments:
+			calls:  list[int] --> allele profile
+		Returns:
+			int
+	"""
+	try:
+		return int.from_bytes(array(LANE_TYPE, calls).tobytes(), 'little')
+	except OverflowError:
+		# calls that don't fit in a lane (only in files saved before they were checked on loading) count as missing
+		return int.from_bytes(array(LANE_TYPE, [call if 0 <= call <= LANE_MAX else 0 for call in calls]).tobytes(), 'little')
+
+def FoldLanes(packed, low=None):
+	"""
+	FoldLanes:  return input packed profile with each lane reduced to its lowest bit, set only if the lane was non-zero
+		Arguments:
+			packed:  int --> packed allele profile (see PackProfile)
+			low:	 int --> laneLow limited to the lanes in packed, if not a full-length profile (e.g. boundLow)
+		Returns:
+			int
+	"""
+	if low is None:
+		low = laneLow
+	# adding all-but-top bits to the rest of a lane carries into its top bit if any of them are set (but never
+	# out of the lane), so with the top bit itself OR'ed in, a lane's top bit is set only if the lane is non-zero
+	packed |= (packed & low) + low
+	# then move top bits to the lowest bit of their lane and clear everything else
+	return (packed >> LANE_TOP_BIT) & laneMask
+
+def CountLanes(mask, nBytes=None):
+	"""
+	CountLanes:  return total lanes set in input mask (from FoldLanes)
+		Arguments:
+			mask:  	int --> folded packed profile, with no more than the lowest bit of each lane set
+			nBytes:	int --> total bytes of lanes in mask, if not a full-length profile
+		Returns:
+			int
+	"""
+	# only the lowest byte of a lane can be non-zero, so counting non-zero bytes counts set lanes
+	if nBytes is None:
+		nBytes = profileBytes
+	return nBytes - mask.to_bytes(nBytes, 'little').count(0)
+
+
+def GetDistance(p1, p2, present1=None, present2=None):
 	"""
 	GetDistance: return total differences between profile 1 (p1) and profile 2 (p2)
 					weighted by total indexes called in both (> 0)
 		Arguments:
-			p1:  list[int] --> allele profile 1
-			p2:  list[int] --> allele profile 2
+			p1:  		int --> packed allele profile 1 (see PackProfile)
+			p2:  		int --> packed allele profile 2 (see PackProfile)
+			present1:	int --> FoldLanes(p1), if already computed (e.g. when comparing one profile to many)
+			present2:	int --> FoldLanes(p2), if already computed
 			
 		Returns:
 			float
@@ -1259,10 +1751,26 @@ def GetDistance(p1, p2):
 	# update total distances calculated
 	global cntDistancesCalculated
 	cntDistancesCalculated += 1
+	if present1 is None:
+		present1 = FoldLanes(p1)
+	# fold p2 and p1 XOR p2 (non-zero only where calls differ) as in FoldLanes, inline, and without clearing
+	# bits outside the lowest of each lane, since AND'ing with present1 (already cleared) does that below
+	low = laneLow
+	diff = p1 ^ p2
+	if present2 is None:
+		present = present1 & ((((p2 & low) + low) | p2) >> LANE_TOP_BIT)
+	else:
+		present = present1 & present2
+	diff = (((diff & low) + low) | diff) >> LANE_TOP_BIT
+	# mark loci called in both with 1, and those among them whose allele calls differ with 3,
+	# so both totals come from a single conversion to bytes
+	lanes = (present | (diff & present) << 1).to_bytes(profileBytes, 'little')
+	# drop zero bytes (only the lowest byte of a lane can be non-zero), leaving one byte per locus called in both
+	lanes = lanes.translate(None, b'\x00')
 	# compute total loci called in both profiles
-	nCommon = sum([p1[i]>0 and p2[i]>0 for i in range(len(p1))])
-	# calculate total allele calls that differ between profiles
-	nDiff = sum([p1[i] != p2[i] for i in range(len(p1)) if p1[i] and p2[i]])
+	nCommon = len(lanes)
+	# and total allele calls that differ between them
+	nDiff = lanes.count(3)
 	# if profiles share called loci (i.e. nCommon > 0),
 	if nCommon:
 		# return percent different
@@ -1271,9 +1779,44 @@ def GetDistance(p1, p2):
 		# if not, return 100% different
 		return 100.
 
+def MissingLociError(corePercent):
+	"""
+	MissingLociError:  return most that GetDistance between two profiles passing QC can differ from their distance over
+						all loci, were missing allele calls known.  Only the latter is a metric (obeys the triangle inequality),
+						so this is the margin to allow for each distance in any triangle inequality used to skip calculating one.
+						Of n loci, say C are called in both profiles and k of those differ: GetDistance is 100k/C, while the
+						distance over all loci is between 100k/n and 100(k+n-C)/n, both within 100(n-C)/n of 100k/C (as k <= C),
+						and n-C is at most the loci missing from either profile (each at most 100-100*corePercent percent,
+						plus 0.5 as CheckCore rounds presence to 2 decimals).
+		Arguments:
+			corePercent:  float --> fraction of loci that must be called (> 0) to pass QC
+		Returns:
+			float
+	"""
+	return 2.0*(100.0 - 100.0*corePercent + 0.5)
+
+def GetDistanceLowerBound(p1, p2):
+	"""
+	GetDistanceLowerBound:  return a value GetDistance between profile 1 (p1) and profile 2 (p2) can't be below, using only
+							the loci in boundMask (a fraction of the cost), to rule out far-off profiles before calculating it
+		Arguments:
+			p1:  int --> packed allele profile 1 (see PackProfile)
+			p2:  int --> packed allele profile 2 (see PackProfile)
+			
+		Returns:
+			float
+	"""
+	# keep only lanes being checked
+	p1 &= boundMask
+	p2 &= boundMask
+	# calculate allele calls that differ between profiles among those loci called in both
+	nDiff = CountLanes(FoldLanes(p1 ^ p2, boundLow) & FoldLanes(p1, boundLow) & FoldLanes(p2, boundLow), boundBytes)
+	# full distance is at least this, even if no other loci differ and all loci are called in both
+	return 100.0 * float(nDiff) / float(len(coreLoci))
+
 
 #=========================== NAMING FUNCTION ================================#
-def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
+def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent, distances=None):
 	"""
 	CalcName: Primary naming function.  Determines if Key to be named (unNamedEntry) belongs in any existing
 				Node of named keys (named) in input Tree (tree), using input distance thresholds (thresholds),
@@ -1285,16 +1828,34 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 			unNamedEntry:	string --> key of new allele profile to assign an Allele Code
 			thresholds:		list --> list of numbers (float) for iterative distance calculation
 			corePercent:	float --> total percent of input allele profile that must be > 0
+			distances:		dict --> {key:array('d')...} distances already calculated to named keys (indexed in order of named),
+								e.g. those of an identical allele profile named earlier; filled in further here (optional)
 			
 		Returns:
 			updated tree (Tree) with new allele profile added at appropriate Node
 	"""
-	# Create a local copy of the named keys
-	namedEntries = named if isinstance(named, list) else list(named)
-
 	# keep distance locally, only calculate those you really need
-	distances = {}
-	index = { namedEntryKey: i for i, namedEntryKey in enumerate(namedEntries) }
+	if distances is None:
+		distances = {}
+	# position of each named key in distance arrays, straight from input named keys (no copy of them needed)
+	index = { namedEntryKey: i for i, namedEntryKey in enumerate(named) }
+	nNamed = len(index)
+	
+	def GetMyDistances(entryKey):
+		"""
+		GetMyDistances:  return input key's array of distances to every named Key, adding it to distances dict with -1
+							for all pairwise distances if not already there, or padding it with -1 for Keys named since
+			Arguments:
+				entryKey:  string --> Key of allele profile to get distances for
+			Returns:
+				array('d') (packed doubles, rather than a list of float objects, as there's one per named Key)
+		"""
+		myDistances = distances.get(entryKey)
+		if myDistances is None:
+			myDistances = distances[entryKey] = array('d', [-1.0])*nNamed
+		elif len(myDistances) < nNamed:
+			myDistances.extend(array('d', [-1.0])*(nNamed - len(myDistances)))
+		return myDistances
 	
 	def GetDistanceToNamedEntry(unNamedEntryKey, namedEntryKey):
 		"""
@@ -1307,12 +1868,8 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 			Returns:
 				float --> result of GetDistance function between allele profiles corresponding to input unnamed and named Keys
 		"""
-		# add unNamedEntryKey to distances dict if not already there with -1 for all pairwise distances
-		if unNamedEntryKey not in distances:
-			distances[unNamedEntryKey] = [-1.0]*len(namedEntries)
-		
 		# myDistances: shorthand for input unNamedEntryKey's distances (all -1's at start)
-		myDistances = distances[unNamedEntryKey]
+		myDistances = GetMyDistances(unNamedEntryKey)
 		
 		# if distance between input Keys is already determined, return it
 		i = index[namedEntryKey]
@@ -1320,15 +1877,39 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 			return myDistances[i]
 		
 		# otherwise, update local distance dict with GetDistance result and return it
-		v1 = alleles.GetCalls(namedEntryKey)
-		v2 = alleles.GetCalls(unNamedEntryKey)
-		d = GetDistance(v1, v2)
+		v1, present1 = alleles.GetPackedLanes(namedEntryKey)
+		v2, present2 = alleles.GetPackedLanes(unNamedEntryKey)
+		d = GetDistance(v1, v2, present1, present2)
 		
 		myDistances[i] = d
 		
 		return d
 
-	def IsInCluster(unNamedEntryKey, node, threshold, corePercent):
+	def GetDistancesToNamedEntries(unNamedEntryKey, namedEntryKeys):
+		"""
+		GetDistancesToNamedEntries:	same as GetDistanceToNamedEntry above for each of input named Keys in turn, but only
+									preparing the allele profile of input unnamed Key once for all of them
+			Arguments:
+				unNamedEntryKey:	string --> Key of allele profile undergoing Allele Code assignment
+				namedEntryKeys:		iterable --> Keys of allele profiles that HAVE an Allele Code
+				
+			Returns:
+				float as iterator (one distance per named Key, so callers can stop early)
+		"""
+		myDistances = GetMyDistances(unNamedEntryKey)
+		
+		query = None
+		for namedEntryKey in namedEntryKeys:
+			i = index[namedEntryKey]
+			if myDistances[i] < 0:
+				# look up unnamed profile once, on the first distance actually calculated
+				if query is None:
+					query, queryPresent = alleles.GetPackedLanes(unNamedEntryKey)
+				named, namedPresent = alleles.GetPackedLanes(namedEntryKey)
+				myDistances[i] = GetDistance(query, named, queryPresent, namedPresent)
+			yield myDistances[i]
+
+	def IsInCluster(unNamedEntryKey, node, threshold, corePercent, nearest=None):
 		"""
 		IsInCluster:	returns whether input unNamedEntryKey belongs in current node
 						
@@ -1337,6 +1918,7 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 				node:	Node object --> node containing keys to be added or excluded by comparing distance to input threshold
 				threshold:  float --> maximum distance value allowed for adding to input Node
 				corePercent:  float --> percent of allelic profile that must be > 0 to pass QC
+				nearest:  tuple --> (distance, key) of founder nearest to unNamedEntryKey of those compared so far (optional)
 			Returns:
 				bool -->	1. True if distance to founder ("Preferred") is less than input threshold
 							2. False if 2*node diameter plus 10% buffer is greater than input threshold
@@ -1344,19 +1926,69 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 								from founder than input threshold but less than threshold for another member of node
 							4. False if all of the above fails
 		"""
+		# read node's founder and diameter, and the buffer for missing loci, once for all checks below
+		preferred = node.Preferred
+		diameter = node.Diameter
+		buffer = 2.0*(100.0 - 100.0*corePercent)
+		# and margin for missing loci in each distance of a triangle inequality
+		error = MissingLociError(corePercent)
+		myDistances = GetMyDistances(unNamedEntryKey)
+		
+		# if distance to preferred cluster sample isn't known yet, first see if it must be too far off (as below)
+		if myDistances[index[preferred]] < 0:
+			# by the triangle inequality, distance to preferred is at least that between the nearest founder and
+			# this one (cached on node, since the same founders are compared for each new key) less distance to
+			# the nearest, and less the margin for missing loci for each of the three distances (see MissingLociError)
+			if nearest is not None and nearest[1] != preferred:
+				dNearest, nearestKey = nearest
+				founderDistances = node.FounderDistances
+				dFounders = founderDistances.get(nearestKey)
+				if dFounders is None:
+					founder, founderPresent = alleles.GetPackedLanes(preferred)
+					nearestFounder, nearestPresent = alleles.GetPackedLanes(nearestKey)
+					dFounders = founderDistances[nearestKey] = GetDistance(founder, nearestFounder, founderPresent, nearestPresent)
+				if dFounders - dNearest - 3.0*error - diameter - buffer > threshold:
+					return False
+			# or from only a fraction of the loci
+			d = GetDistanceLowerBound(alleles.GetPackedCalls(preferred), alleles.GetPackedCalls(unNamedEntryKey))
+			if d - diameter - buffer > threshold:
+				return False
+		
 		# distance to preferred cluster sample
-		d = GetDistanceToNamedEntry(unNamedEntryKey, node.Preferred)
+		d = GetDistanceToNamedEntry(unNamedEntryKey, preferred)
 		if d <= threshold: 
 			return True
 		
 		# if the sample is too far off, just say it's too far off
-		if d - node.Diameter - 2.0*(100.0 - 100.0*corePercent) > threshold:
+		if d - diameter - buffer > threshold:
 			# calculated distance is more than Node diameter plus 10% buffer
 			return False
 		else:
 			# calculated distance might be in cloud around preferred Key, so compare to everything in the Node
-			for sample2 in node.EntryKeys:
-				if GetDistanceToNamedEntry(unNamedEntryKey, sample2) <= threshold:
+			# that can be close enough: by the triangle inequality, distance to a Key is at least the difference
+			# of both distances to founder, less the margin for missing loci for each of the three distances
+			# (see MissingLociError), so Keys further off than that can't be under threshold and are skipped
+			founderDistances = node.FounderDistances
+			founder = None
+			candidates = []
+			for entryKey in node.EntryKeys:
+				# distance already known, nothing to prune, and free to check first
+				if myDistances[index[entryKey]] >= 0:
+					candidates.append((-1.0, entryKey))
+					continue
+				dFounder = founderDistances.get(entryKey)
+				if dFounder is None:
+					if founder is None:
+						founder, founderPresent = alleles.GetPackedLanes(preferred)
+					member, memberPresent = alleles.GetPackedLanes(entryKey)
+					dFounder = founderDistances[entryKey] = GetDistance(founder, member, founderPresent, memberPresent)
+				bound = abs(d - dFounder)
+				if bound - 3.0*error <= threshold:
+					candidates.append((bound, entryKey))
+			# compare to Keys that can be closest first, since comparisons stop at the first one under threshold
+			candidates.sort()
+			for d in GetDistancesToNamedEntries(unNamedEntryKey, [entryKey for bound, entryKey in candidates]):
+				if d <= threshold:
 					# if distance to any existing Keys is under threshold, then it belongs there
 					return True
 			# if we haven't found a single match, then it doesn't belong
@@ -1371,7 +2003,7 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 			Returns:
 				float --> maximum distance of one-vs-all comparisons between input key's allele profile and all others in input node
 		"""
-		return max(GetDistanceToNamedEntry(entryKey, m) for m in node.EntryKeys)
+		return max(GetDistancesToNamedEntries(entryKey, node.EntryKeys))
 		
 	# Make sure thresholds are sorted biggest first
 	thresholds.sort(key=lambda x: -x)
@@ -1380,12 +2012,17 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 	headNode = tree.Tree()
 
 	# Ensure unNamedEntryKey has no name
-	patternName = tree.GetName(unNamedEntry)
-	assert len(patternName) == 0
+	assert len(tree.GetName(unNamedEntry)) == 0
+	# digits of its Allele Code, compiled level by level below
+	patternName = []
 
 	# currentNode = placeholder for headNode as unNamedEntryKey is placed into child nodes
 	currentNode = headNode
 
+	# (distance, key) of the nearest founder to unNamedEntry compared so far, for pruning comparisons to others
+	nearest = None
+	myDistances = GetMyDistances(unNamedEntry)
+
 	# See if unnamed entry belongs to any existing Nodes at each threshold
 	clusterIdAtPreviousLevel = ''
 	for level, threshold in enumerate(thresholds, 1):
@@ -1396,10 +2033,15 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 
 		for node in currentNode.GetChildrenNodes():
 			# if unNamedEntry key really belongs in this node,
-			if IsInCluster(unNamedEntry, node, threshold, corePercent):
+			inCluster = IsInCluster(unNamedEntry, node, threshold, corePercent, nearest)
+			# keep track of nearest founder
+			d = myDistances[index[node.Preferred]]
+			if d >= 0 and (nearest is None or d < nearest[0]):
+				nearest = (d, node.Preferred)
+			if inCluster:
 				# add digit to closestClusters set
 				keyToGet = node.Preferred
-				partial = tuple(tree.GetPart(keyToGet, level))								
+				partial = tree.GetPart(keyToGet, level)								
 				closestClusters.add(partial)
 				# and node itself to list of verified matches
 				matchingNodes.append(node)
@@ -1415,8 +2057,7 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 			# update the node diameter to the max distance between its current value 
 			# and all pairwise comparisons with the new unNamedEntry,
 			currentNode.Diameter = max(currentNode.Diameter, GetDistanceToNamedEntry(unNamedEntry, currentNode.Preferred))
-			# and add unNamedEntry key to updated Node's list of keys
-			currentNode.EntryKeys.append(unNamedEntry)
+			# (unNamedEntry key is added to updated Node's list of keys by AddNamedChild once it's named below)
 						
 		# if NO matching nodes were found,
 		elif len(closestClusters) == 0:
@@ -1477,6 +2118,9 @@ def CalcName(named, tree, alleles, unNamedEntry, thresholds, corePercent):
 
 	# alert if unNamedEntry's Allele Code wasn't updated to the compiled patternName list
 	assert currentNode.GetChildName(unNamedEntry) == patternName,  "Hmm, {} seems to be in the wrong named node? {}  != {} ".format(unNamedEntry, currentNode.GetChildName(unNamedEntry), patternName)
+	
+	# record unNamedEntry's Allele Code in the tree's names, sharing its NamedNode's code
+	tree.FinalizeName(unNamedEntry, currentNode.Code())
 
 	# in the end, return the edited input tree
 	return tree
@@ -1566,18 +2210,24 @@ class Calculator(object):
 		"""
 		Write results to output file path (self._output), using input delimiter to determine file extension
 		"""
-		with open(self._output, 'w') as f:
+		# write through a large buffer, so rows reach the file in big blocks
+		with open(self._output, 'w', buffering=1<<20) as f:
 			# start with header line
 			f.write('{}\n'.format(outDelim.join(['Key', 'Allele_code'])))
-			
-			for key, value, complete in self._tree.FinalizeCDCNames():
-				# new and changed codes
-				if key in self._newKeys or key in self._changedKeys:
-					f.write('{}\n'.format(outDelim.join([key, value])))
-				# new profiles that didn't pass QC
-				if key in self._belowQC:
-					criteria = ', '.join(self._belowQC[key])
-					f.write('{}\n'.format(outDelim.join([key, 'FAILED QC: {}'.format(criteria) ])))
+			f.writelines(self._ResultLines(outDelim))
+	
+	def _ResultLines(self, outDelim):
+		"""
+		_ResultLines:  yield each line of results written by WriteResults, using input delimiter between fields
+		"""
+		for key, value, complete in self._tree.FinalizeCDCNames():
+			# new and changed codes
+			if key in self._newKeys or key in self._changedKeys:
+				yield '{}\n'.format(outDelim.join([key, value]))
+			# new profiles that didn't pass QC
+			if key in self._belowQC:
+				criteria = ', '.join(self._belowQC[key])
+				yield '{}\n'.format(outDelim.join([key, 'FAILED QC: {}'.format(criteria) ]))
 			
 	def DoCalc(self, args):
 		"""
@@ -1593,12 +2243,27 @@ class Calculator(object):
 			4.	Save results if --nosave flag was not provided
 		"""
 		global numChanged
-		
+
+		# Maximum number of 0's allowed per profile length, derived once from the presence cutoff
+		# (presence only rises with the number of calls, so the first passing count bounds them all)
+		maxZeros = {}
+
+		def MaxZeros(nLoci):
+			"""
+			MaxZeros: return the largest number of 0's a profile of nLoci calls may hold and still pass QC
+			"""
+			if nLoci not in maxZeros:
+				nCalled = 0
+				while nCalled <= nLoci and round(float(nCalled) / float(nLoci),2) < self._minPres:
+					nCalled += 1
+				maxZeros[nLoci] = nLoci - nCalled
+			return maxZeros[nLoci]
+
 		def CheckCore(calls):
 			"""
 			CheckCore: return None if more 0's than allowed in allele profile or the input allele profile if not
 			"""
-			if round(float(len(calls) - calls.count(0)) / float(len(calls)),2) < self._minPres:
+			if calls.count(0) > MaxZeros(len(calls)):
 				return None
 			else:
 				return calls
@@ -1616,7 +2281,7 @@ class Calculator(object):
 				FILE_PATH = os.path.join(DIR_NAME, FILE_NAME)
 
 				# use class function to write nomenclature tree to open file
-				with open(FILE_PATH, 'w') as f:
+				with open(FILE_PATH, 'wb') as f:
 					self._tree.Save(f)
 				
 				# Log successful save and remove old tree from 'current' directory if not an exact match
@@ -1633,7 +2298,7 @@ class Calculator(object):
 
 				# Log save operation
 				log_message('SaveTree: creating new file @ {}'.format(FILE_PATH), depth=1)
-				with open(FILE_PATH, 'w') as f:
+				with open(FILE_PATH, 'wb') as f:
 					self._tree.Save(f)
 					
 			# output new tree's file path to reset _treepath member variable after intermittent saves
@@ -1699,8 +2364,8 @@ class Calculator(object):
 		# Set algorithm start time
 		date = Now()
 		
-		# Get all the current names
-		namedEntries = list(self._tree.GetNames())
+		# Get all the current names (as dict keys: in naming order, and quick to look up)
+		namedEntries = dict.fromkeys(self._tree.GetNames())
 		
 		# Log start time
 		log_message('Beginning calculation at {}'.format(datetime.now().strftime('%I:%M:%S %p')))
@@ -1712,34 +2377,57 @@ class Calculator(object):
 		newProfiles = {key:calls for key, calls in newProfiles.items() if key not in namedEntries}
 		numProfiles = len(newProfiles)
 		
+		# Find new profiles identical to an earlier one, so distances calculated for the first can be reused
+		# for the rest rather than calculated again
+		sharedDistances = SharedDistances(newProfiles)
+		
 		# Time to assign names:
 		print('Calculating and assigning Allele Codes')
-		# progress bar increment, so only 20 dots are printed to terminal
-		progressChunk = int(numProfiles/20) if numProfiles > 20 else 1
+		# progress bar increment, so only PROGRESS_WIDTH dots are printed to terminal
+		progressChunk = int(numProfiles/PROGRESS_WIDTH) if numProfiles > PROGRESS_WIDTH else 1
 		nChunks = 0
+		# dots (and spaces to the percentage) for every number of chunks reached, built once
+		progressBars = ['.'*n + ' '*(PROGRESS_WIDTH-n) for n in range(numProfiles//progressChunk + 1)]
+		shownPercent = -1
+		
+		# bind what is used for every profile once
+		hasName = self._tree.HasName
+		hasKey = self._alleleCalls.HasKey
+		addCalls = self._alleleCalls.Add
+		newKeys = self._newKeys
+		belowQC = self._belowQC
+		alleleCalls = self._alleleCalls
+		thresholds = self._thresholds
+		minPres = self._minPres
 		
 		for i, (key, calls) in enumerate(newProfiles.items()):
-			# update progress "bar"
-			sys.stdout.write('.'*nChunks + ' '*(20-nChunks) + '{}%'.format(int(float(100*(i+1))/float(numProfiles))) + '\r')
-			sys.stdout.flush()
-			# update "chunk" variable at every 5% of profiles assessed to keep progress dots at 20 or less
+			# update progress "bar", only writing (and flushing) to terminal when the percentage shown changes
+			percent = int(float(100*(i+1))/float(numProfiles))
+			if percent != shownPercent:
+				sys.stdout.write('{}{}%\r'.format(progressBars[nChunks], percent))
+				sys.stdout.flush()
+				shownPercent = percent
+			# update "chunk" variable at every 1/PROGRESS_WIDTH of profiles assessed to keep progress dots at PROGRESS_WIDTH or less
 			if i and i % progressChunk == 0:
 				nChunks += 1
 			
 			log_message('Trying to add entry: {}'.format(key), depth=1)
+			
+			# QC of allele profile, done once for either path below
+			eCalls = CheckCore(calls)
 
 			# Check to see if we have a name in tree file
-			if self._tree.HasName(key):
+			if hasName(key):
 				# Then see if it's missing from allele calls file
-				if not self._alleleCalls.HasKey(key):
+				if not hasKey(key):
 					# Still in tree file, but not allele calls file,
 					# so check QC metrics before adding back to allele calls dictionary
 					
-					if CheckCore(calls):
-						self._alleleCalls.Add(key, calls)
+					if eCalls is not None:
+						addCalls(key, calls)
 					else:
 						log_message('Entry: {} has Allele Code, but is below'
-									'the {} presence cutoff'.format(key, self._minPres))
+									'the {} presence cutoff'.format(key, minPres))
 
 				# Key found in both tree and allele calls files, so skip it
 				log_message('This entry has a name, skipping...', depth=1)
@@ -1749,41 +2437,46 @@ class Calculator(object):
 			log_message('Performing QC...', depth=2)
 			
 			# add to selection tracker
-			self._newKeys.add(key)
+			newKeys.add(key)
 			
 			qcFail = False
-			
-			eCalls = CheckCore(calls)
 
 			# Continue if we don't meet QC standards
 			if eCalls is None:
-				self._belowQC[key].append('CORE')
+				belowQC[key].append('CORE')
 				qcFail = True
 			
 			if qcFail:
 				log_message('Entry failed QC', depth=3)
 				continue
 			else:
-				self._alleleCalls.Add(key, eCalls)
+				addCalls(key, eCalls)
 				log_message('Passed QC', depth=3)
 			
 			log_message('Assigning name...', depth=2)
 			
+			# Start from distances already calculated for an identical profile, if any
+			distances = sharedDistances.Take(key)
+			
 			# Reset tree with new entry added
 			self._tree = CalcName(namedEntries, 
 									self._tree, 
-									self._alleleCalls, 
+									alleleCalls, 
 									key, 
-									self._thresholds, 
-									self._minPres)
+									thresholds, 
+									minPres,
+									distances)
+			
+			# Keep distances around for later identical profiles
+			sharedDistances.Keep(key, distances)
 
 			# Log successful naming of new profile
-			if self._tree.HasName(key):
-				namedEntries.append(key)
+			if hasName(key):
+				namedEntries[key] = None
 				log_message('Successfully assigned name!', depth=3)
 
-		# finish by updating progress bar to 100%
-		sys.stdout.write('{}{}%\n'.format('.'*22, 100))
+		# finish by updating progress bar to 100%, with every dot drawn
+		sys.stdout.write('{}{}%\n'.format('.'*PROGRESS_WIDTH, 100))
 		sys.stdout.flush()
 		
 		# After completing assignment,
@@ -1791,8 +2484,11 @@ class Calculator(object):
 		# - save results and changes to output file if -o/--output provided, or print to screen otherwise
 		
 		# To better tabularize changed codes output
-		maxKeyLen = max([0] + [len(key) for key in namedEntries])
-		maxOldLen = max([0] + [len(code) for code in self._tree._oldNames.values() if len(code)])
+		maxKeyLen = max((len(key) for key in namedEntries), default=0)
+		maxOldLen = max((len(code) for code in self._tree._oldNames.values() if code), default=0)
+		# padding to those lengths, sliced past each key or code rather than built again for every row
+		keyPad = ' '*maxKeyLen
+		oldPad = ' '*maxOldLen
 		
 		if self._nosave:
 			if self._output:
@@ -1804,20 +2500,20 @@ class Calculator(object):
 				for key, value, complete in self._tree.FinalizeCDCNames():
 					if key in self._newKeys:
 						print('{} {} {}'.format(key, 
-												' '*(maxKeyLen - len(key)), 
+												keyPad[len(key):], 
 												value))
 					if key in self._changedKeys:
 						print('{} {} {} {}\t-->\t{}'.format(key, 
-													' '*(maxKeyLen - len(key)), 
+													keyPad[len(key):], 
 													self._alleleCalls._oldNames[key], 
-													' '*(maxOldLen - len(currName)), 
+													oldPad[len(currName):], 
 													value))
 				# follow up with FAILED QC profiles
-				for key in self._belowQC:
+				for key, criteria in self._belowQC.items():
 					if key in self._newKeys:
 						print('{} {} {}'.format(key, 
-												' '*(maxKeyLen - len(key)), 
-												'FAILED QC: {}'.format(', '.join(self._belowQC[key]))))
+												keyPad[len(key):], 
+												'FAILED QC: {}'.format(', '.join(criteria))))
 			
 		else:
 			# --nosave not provided, so output results to file or terminal
@@ -1829,71 +2525,88 @@ class Calculator(object):
 			# Number of names given to previously unnamed entries OR those changed by algorithm
 			numToSave = 0
 			oldNumToSave = 0
+			saveInterval = SAVE_INTERVAL
+			lastSave = time.monotonic()
+			
+			# bind what is used for every key once
+			oldNames = self._tree._oldNames
+			newKeys = self._newKeys
+			output = self._output
 			
 			# For each key
 			for key, name, complete in self._tree.FinalizeCDCNames():
 				# Check if the current name is different from previous assignment
-				currName = self._tree._oldNames[key]
-				if len(currName)==0:
-					# new assignments return an empty list, so change currName to string
-					# with prefix and version only
-					currName = '{}{} - '.format(prefix, version)
+				currName = oldNames.get(key, ())
 				
 				#check if the name after applying the blacklisting is different
 				xName = CheckXcodeList(name)
 				newName = xName
 				
-				# Log change if one occured
-				if '.'.join(currName.split('.')[:len(newName.split('.'))]) != newName:
+				if len(currName)==0:
+					# new assignments have no old name (empty tuple), so there is no change to classify,
+					# but increment numToSave, so incremental save includes them as well
+					numToSave += 1
+				
+				# Log change if one occured (old code is neither the new one, nor extends it by more digits)
+				elif not (currName == newName or currName.startswith(newName + '.')):
+					# split both codes into digits once, for all comparisons below
+					cSplit = currName.split('.')
+					nSplit = newName.split('.')
+					lc = len(cSplit)
+					ln = len(nSplit)
+					
 					# increment numToSave, so incremental save includes changed codes
 					numToSave += 1
 					
 					# log change if not a new assignment
-					if len(currName) and not currName.strip().endswith('-'):
+					if not currName.strip().endswith('-'):
 						# print changed codes regardless of --verbose flag
-						print('{} {} {} {}\t{}\t{}'.format(key, ' '*(maxKeyLen - len(key)), currName, ' '*(maxOldLen - len(currName)), '-->', newName))
-						# Add change to date-stamped change_log file with type of change that occured
-						changedKeys[key] = {'OldValue':currName, 'NewValue': newName}
-						# also indicate type of change
-						if currName.endswith('x') or newName.endswith('x'):
+						print('{} {} {} {}\t{}\t{}'.format(key, keyPad[len(key):], currName, oldPad[len(currName):], '-->', newName))
+						# determine type of change that occured
+						# (Xcodes end in 'x' as their last digit, see CheckXcodeList; new assignments never get here)
+						if cSplit[-1].endswith('x') or nSplit[-1].endswith('x'):
 							# was previously or is now an Xcode
-							changedKeys[key].update({'ChangeType':'X'})
-						elif len(currName.split('.')) < len(newName.split('.')):
+							changeType = 'X'
+						elif lc < ln:
 							# new code is longer,
-							if currName == '.'.join(newName.split('.')[:len(currName.split('.'))]):
+							if currName == '.'.join(nSplit[:lc]):
 								# new code is same up to length of old code ("Extended")
-								changedKeys[key].update({'ChangeType':'Extended'})
+								changeType = 'Extended'
 							else:
 								# new code changed at some digit ("Merged")
-								changedKeys[key].update({'ChangeType':'Merged@{}'.format(min([i for i, c in enumerate(currName.split('.')) if c!=newName.split('.')[i]]))})
+								changeType = 'Merged@{}'.format(next((i for i, (c, n) in enumerate(zip(cSplit, nSplit)) if c != n), lc))
 						else:
 							# other cases:
-							cName = currName.split('.')
-							nName = newName.split('.')
-							if any([cName[i] != nName[i] for i in range(min([len(cName), len(nName)]))]):
+							# first digit that differs, if any (-1 otherwise)
+							idx = next((i for i, (c, n) in enumerate(zip(cSplit, nSplit)) if c != n), -1)
+							if idx >= 0:
 								# old code is same length but digit changed ("Merged")
-								changedKeys[key].update({'ChangeType':'Merged@{}'.format(min([i for i in range(min([len(cName), len(nName)])) if cName[i]!=nName[i]]))})
+								changeType = 'Merged@{}'.format(idx)
 							else:
 								# another situation, likely removal of a Key from reference files, so code was shortened
-								changedKeys[key].update({'ChangeType':'Other'})
+								changeType = 'Other'
+						# and add change to date-stamped change_log file
+						changedKeys[key] = ChangeRow(key, currName, newName, changeType)
 					
 
 				if complete:
 					namesGiven += 1
 					
 				# increment numToSave variable, so incremental save includes previously unnamed selected entries
-				if key in self._newKeys:
+				if key in newKeys:
 					numToSave += 1
-					if not self._output:
+					if not output:
 						print('{} {} {}'.format(key, 
-												' '*(maxKeyLen - len(key)), 
+												keyPad[len(key):], 
 												newName))
 
 				# Save everything after any of the current selection is named and either
-				# 1000 of them have been named or previously named entries have changed 
-				# to avoid stressing the system and to make sure files are up to date 
+				# saveInterval of them have been named or previously named entries have changed,
+				# or SAVE_SECONDS have passed, to avoid stressing the system (each save rewrites
+				# every file, so saves get further apart) and to make sure files are up to date
 				# as best as possible if something breaks
-				if numToSave > oldNumToSave and numToSave % 1000 == 0:
+				if numToSave - oldNumToSave >= saveInterval or \
+						(numToSave > oldNumToSave and time.monotonic() - lastSave > SAVE_SECONDS):
 					log_message('Intermittent save (numChanged = {})'.format(len(changedKeys)), depth=1)
 					print('=====Intermittent save (total changed:  {})====='.format(len(changedKeys)))
 					# save over allele profile files
@@ -1903,12 +2616,15 @@ class Calculator(object):
 					# update oldNumToSave, so script won't keep saving files when no selected/changed entries
 					# have been encountered while writing to file
 					oldNumToSave = numToSave
+					saveInterval = min(2*saveInterval, MAX_SAVE_INTERVAL)
+					lastSave = time.monotonic()
 					
-			# print FAILED QC profiles if -o/--output path not provided
-			for key in self._belowQC:
-				criteria = ', '.join(self._belowQC[key])
-				if not self._output:
-					print([key, 'FAILED QC: {}'.format(criteria)])
+			# print FAILED QC profiles if -o/--output path not provided, lined up with the named ones above
+			if not output:
+				for key, criteria in self._belowQC.items():
+					print('{} {} {}'.format(key, 
+											keyPad[len(key):], 
+											'FAILED QC: {}'.format(', '.join(criteria))))
 
 			# One final save after all is done
 			self._alleleCalls.Save(self._callspath)
@@ -1922,13 +2638,11 @@ class Calculator(object):
 		# Write changed Allele Codes to file once everything is done
 		self._numChanged = len(changedKeys)
 		if self._numChanged and len(self._changeLogPath):
-			with open(self._changeLogPath, 'a+') as f:
-				f.write('{}\n'.format('\n'.join('\t'.join([key, 
-															vals['OldValue'], 
-															vals['NewValue'], 
-															vals['ChangeType']]) for key, vals in changedKeys.items())))
-				f.write('=====Assignment Complete ({})====='.format(Now()) + '\n')
-				f.close()
+			# one line per changed key, written out together through a large buffer
+			lines = ['{}\t{}\t{}\t{}\n'.format(*row) for row in changedKeys.values()]
+			lines.append('=====Assignment Complete ({})=====\n'.format(Now()))
+			with open(self._changeLogPath, 'a+', buffering=1<<20) as f:
+				f.writelines(lines)
 				
 					
 def Run(runtimeArgs):
@@ -2042,11 +2756,10 @@ def Setup():
 			
 			# Get the paths ('current' subdirectory)
 			PATH_DIR = os.path.join(path, 'current')
-			PATH_FILES = [ os.path.join(PATH_DIR, file) for file in \
-				os.listdir(PATH_DIR) ]
-
-			# Make sure we only have real files
-			PATH_FILES = list(filter(os.path.isfile, PATH_FILES))
+			
+			# Make sure we only have real files (file type comes with directory entries, so no stat per file)
+			with os.scandir(PATH_DIR) as entries:
+				PATH_FILES = [ entry.path for entry in entries if entry.is_file() ]
 			
 			# There should never be more than one file in the 'current' subdirectory
 			if not hasMultipleFiles and len(PATH_FILES) > 1:
@@ -2062,10 +2775,8 @@ def Setup():
 					# Copy file to parent directory
 					log_message('Writing to disk')
 					
-					with open(IN_FILE, 'rb') as f_in, \
-							open(OUT_FILE, 'wb') as f_out:
-						
-						shutil.copyfileobj(f_in, f_out)
+					# (done in the kernel, e.g. with os.sendfile, on Python 3.8+)
+					shutil.copyfile(IN_FILE, OUT_FILE)
 					
 					# Log that back-up was successful
 					log_message('Successfully backed up: {}'.format(IN_FILE))
@@ -2077,20 +2788,10 @@ def Setup():
 			# OR
 			# multiple files where there shouldn't be (input hasMultipleFiles == False, but count > 0)
 			else:
-				# get list of folder contents
-				OLD_FILES = os.listdir(PATH_DIR)
-				# filter out non-files
-				OLD_FILES = list(filter(os.path.isfile, OLD_FILES))
-				
-				# if anything is left that wasn't caught above (count==1 or count > 1),
-				# then raise error to stop run
-				if len(OLD_FILES) > 0:
-					raise AssertionError('We are missing our most current'
-						'file in: {}'.format(PATH_DIR))
-				else:
-					# no files present here, so log message and return path to 'current' folder
-					log_message('Initializing path: {} for organism: {}'.format(path, prefix))
-					return PATH_DIR
+				# no files present here (or several, where several are allowed),
+				# so log message and return path to 'current' folder
+				log_message('Initializing path: {} for organism: {}'.format(path, prefix))
+				return PATH_DIR
 
 		# Add files here in the future, make sure that the files follow the 
 		# backup scheme in the above backup function
@@ -2136,9 +2837,12 @@ def Setup():
 		RUNTIME_ARGS['changeLog'] = changeLogPath
 		
 		# Add path to Xcode file if found
-		xCodeListPath = r'{}\{}\Xcodes.tsv'.format(RUNTIME_ARGS['logpath'], 'Xcodes')
+		xCodeListPath = os.path.join(RUNTIME_ARGS['logpath'], 'Xcodes', 'Xcodes.tsv')
 		if os.path.exists(xCodeListPath):
 			RUNTIME_ARGS['Xcodes'] = xCodeListPath
+			log_message('Found Xcodes file: {}'.format(xCodeListPath))
+		else:
+			log_message('No Xcodes file at: {}'.format(xCodeListPath))
 		
 		# log successful validation and return edited RUNTIME_ARGS dictionary
 		log_message('Successfully validated log files')
@@ -2258,6 +2962,13 @@ if __name__ == '__main__':
 								nargs=1, 
 								type=str,
 								help='output file (tsv or csv) into which results will be written (delimiter determined by input extension)')
+	# - compression level:  trade-off between size and speed of writing allele calls files
+	optionalArgs.add_argument('--compresslevel', 
+								nargs=1, 
+								type=int,
+								choices=range(MAX_COMPRESS_LEVEL + 1),
+								help='gzip compression level (0-{}) of allele calls files written to data directory; '
+									'default = {}'.format(MAX_COMPRESS_LEVEL, DEFAULT_COMPRESS_LEVEL))
 	
 	# get args from user into variables
 	args = inputArgs.parse_args(sys.argv[1:])
@@ -2288,9 +2999,10 @@ if __name__ == '__main__':
 		
 	DATA_DIR = args.dataDir[0]
 	prefix = args.prefix[0]
+	codePrefix = '{}{} - '.format(prefix, version)
 	configPath = args.config[0]
 	with open(configPath, 'r') as c:
-		coreLoci = [line.strip() for line in c if line.startswith(prefix)]
+		SetCoreLoci([line.strip() for line in c if line.startswith(prefix)])
 		
 	# warn user if core locus names didn't load or prefix doesn't match
 	if len(coreLoci)==0:
@@ -2303,6 +3015,8 @@ if __name__ == '__main__':
 		outputPath = args.output[0]
 	nosave = args.nosave
 	verbose = args.verbose
+	if args.compresslevel:
+		compressLevel = args.compresslevel[0]
 	
 	# set log directory from input data directory
 	LOG_DIR = os.path.join(DATA_DIR,
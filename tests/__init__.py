@@ -0,0 +1,18 @@
+"""
+Tests for assignAlleleCodes_py3.6.py, run from the repository root with:  python -m unittest discover -s tests -t .
+"""
+import os
+import importlib.util
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assignAlleleCodes_py3.6.py')
+
+def LoadScript():
+	"""
+	LoadScript:  import assignAlleleCodes_py3.6.py (not importable by name, due to the '.' in it) as a fresh module
+		Returns:
+			module
+	"""
+	spec = importlib.util.spec_from_file_location('assignAlleleCodes', SCRIPT_PATH)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
@@ -0,0 +1,92 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from tests import LoadScript
+
+aac = LoadScript()
+
+
+class PackedCacheTest(unittest.TestCase):
+	def setUp(self):
+		aac.SetCoreLoci(['L{}'.format(i) for i in range(20)])
+		self.cacheSize = aac.PACKED_CACHE_SIZE
+		aac.PACKED_CACHE_SIZE = 50
+		rng = random.Random(1)
+		self.alleles = aac.AlleleCalls()
+		for i in range(500):
+			self.alleles.Add('K{}'.format(i), [rng.randint(0, 3) for locus in aac.coreLoci])
+
+	def tearDown(self):
+		aac.PACKED_CACHE_SIZE = self.cacheSize
+
+	def test_cache_stays_bounded(self):
+		rng = random.Random(2)
+		for n in range(5000):
+			key = 'K{}'.format(rng.randrange(500))
+			calls = self.alleles.GetCalls(key)
+			self.assertEqual(self.alleles.GetPackedCalls(key), aac.PackProfile(calls))
+			self.assertEqual(self.alleles.GetPresentLanes(key), aac.PackProfile([int(call > 0) for call in calls]))
+			self.assertLessEqual(len(self.alleles._packed), aac.PACKED_CACHE_SIZE)
+
+	def test_recently_used_kept(self):
+		self.alleles.GetPackedCalls('K0')
+		for i in range(1, 200):
+			self.alleles.GetPackedCalls('K{}'.format(i))
+			# keep using K0, so it's never the least recently used
+			self.alleles.GetPresentLanes('K0')
+		self.assertIn('K0', self.alleles._packed)
+		self.assertNotIn('K1', self.alleles._packed)
+
+	def test_matrix_profiles_reloaded_after_eviction(self):
+		# enough profiles for matrix files, and more than PACKED_CACHE_SIZE in each
+		rng = random.Random(3)
+		for i in range(500, 2500):
+			self.alleles.Add('K{}'.format(i), [rng.randint(0, 3) for locus in aac.coreLoci])
+		tmpDir = tempfile.mkdtemp()
+		try:
+			expected = { key: self.alleles.GetCalls(key) for key in ['K{}'.format(i) for i in range(2500)] }
+			self.alleles.Save(tmpDir)
+			alleles = aac.AlleleCalls()
+			alleles.Load(tmpDir)
+			self.assertEqual(alleles._nMatrices, 2)
+			for key in list(expected)*2:
+				self.assertEqual(alleles.GetPackedCalls(key), aac.PackProfile(expected[key]))
+			self.assertLessEqual(len(alleles._packed), aac.PACKED_CACHE_SIZE)
+		finally:
+			shutil.rmtree(tmpDir)
+
+
+class MatrixCacheTest(unittest.TestCase):
+	def setUp(self):
+		aac.SetCoreLoci(['L{}'.format(i) for i in range(5)])
+		self.cacheSize = aac.MATRIX_CACHE_SIZE
+		aac.MATRIX_CACHE_SIZE = 2
+		self.tmpDir = tempfile.mkdtemp()
+		rng = random.Random(4)
+		alleles = aac.AlleleCalls()
+		for i in range(12500):
+			alleles.Add('K{}'.format(i), [rng.randint(0, 3) for locus in aac.coreLoci])
+		alleles.Save(self.tmpDir)
+
+	def tearDown(self):
+		aac.MATRIX_CACHE_SIZE = self.cacheSize
+		shutil.rmtree(self.tmpDir)
+
+	def test_read_ahead_stays_bounded(self):
+		alleles = aac.AlleleCalls()
+		alleles.Load(self.tmpDir)
+		self.assertEqual(alleles._nMatrices, 12)
+		firstKeys = {}
+		for key, (i, position) in alleles._index.items():
+			firstKeys.setdefault(i, key)
+		# blocks out of order, so what's read ahead is never the next one wanted
+		for i in [0, 2, 4, 6, 8, 10, 1, 5, 9]:
+			self.assertEqual(len(alleles.GetCalls(firstKeys[i])), 5)
+			self.assertLessEqual(len(alleles._matrices) + len(alleles._loading), aac.MATRIX_CACHE_SIZE + 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,87 @@
+import random
+import unittest
+from unittest import mock
+
+from tests import LoadScript
+
+aac = LoadScript()
+
+N_LOCI = 200
+CORE_PERCENT = 0.95
+THRESHOLDS = [40.0, 20.0, 10.0, 5.0]
+
+
+def MakeProfiles(seed):
+	"""
+	MakeProfiles:  return key:profile dict of clusters of related profiles, each missing up to as many loci as QC allows,
+					with mutation rates putting distances on both sides of every threshold
+	"""
+	rng = random.Random(seed)
+	maxMissing = int(round(N_LOCI*(1.0 - CORE_PERCENT)))
+	profiles = {}
+	for c in range(6):
+		founder = [rng.randint(1, 50) for i in range(N_LOCI)]
+		for m in range(25):
+			rate = rng.choice([0.01, 0.03, 0.07, 0.12, 0.25, 0.4])
+			calls = [rng.randint(51, 99) if rng.random() < rate else call for call in founder]
+			for i in rng.sample(range(N_LOCI), rng.randint(0, maxMissing)):
+				calls[i] = 0
+			profiles['C{}M{}'.format(c, m)] = calls
+	# interleave clusters, so nodes keep growing as keys are named
+	keys = list(profiles)
+	rng.shuffle(keys)
+	return { key: profiles[key] for key in keys }
+
+
+def NameAll(profiles):
+	"""
+	NameAll:  name input profiles in turn as DoCalc does, and return key:name dict and total distances calculated
+	"""
+	aac.cntDistancesCalculated = 0
+	alleles = aac.AlleleCalls()
+	tree = aac.Tree(len(THRESHOLDS))
+	named = {}
+	for key, calls in profiles.items():
+		alleles.Add(key, calls)
+		tree = aac.CalcName(named, tree, alleles, key, THRESHOLDS, CORE_PERCENT, {})
+		if tree.HasName(key):
+			named[key] = None
+	return { key: tree.GetName(key) for key in profiles }, aac.cntDistancesCalculated
+
+
+class PruningTest(unittest.TestCase):
+	def setUp(self):
+		aac.SetCoreLoci(['L{}'.format(i) for i in range(N_LOCI)])
+
+	def test_missing_loci_error_bounds_distance(self):
+		# distance over loci called in both stays within MissingLociError of distance over all loci
+		rng = random.Random(7)
+		error = aac.MissingLociError(CORE_PERCENT)
+		maxMissing = int(round(N_LOCI*(1.0 - CORE_PERCENT)))
+		for n in range(500):
+			full1 = [rng.randint(1, 3) for i in range(N_LOCI)]
+			full2 = [rng.randint(1, 3) if rng.random() < 0.5 else call for call in full1]
+			p1 = list(full1)
+			p2 = list(full2)
+			for i in rng.sample(range(N_LOCI), maxMissing):
+				p1[i] = 0
+			for i in rng.sample(range(N_LOCI), maxMissing):
+				p2[i] = 0
+			exact = 100.0*sum(a != b for a, b in zip(full1, full2))/N_LOCI
+			d = aac.GetDistance(aac.PackProfile(p1), aac.PackProfile(p2))
+			self.assertLessEqual(abs(d - exact), error)
+
+	def test_pruning_keeps_names(self):
+		for seed in range(3):
+			profiles = MakeProfiles(seed)
+			pruned, nPruned = NameAll(profiles)
+			# no margin is large enough to skip anything by the triangle inequality, neither a node's founder
+			# (from distances between founders) nor members in the grey zone (from distances to founder)
+			with mock.patch.object(aac, 'MissingLociError', return_value=float('inf')):
+				unpruned, nUnpruned = NameAll(profiles)
+			self.assertEqual(pruned, unpruned)
+			self.assertLess(nPruned, nUnpruned)
+
+
+if __name__ == '__main__':
+	unittest.main()
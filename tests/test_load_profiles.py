@@ -0,0 +1,80 @@
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+
+from tests import LoadScript
+
+aac = LoadScript()
+
+
+class LoadProfilesFromFileTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.tmpDir = tempfile.mkdtemp()
+		aac.Logger = logging.getLogger('assignAlleleCodes')
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls.tmpDir)
+
+	def setUp(self):
+		aac.delim = '\t'
+		aac.coreLoci = ['L1', 'L2', 'L3']
+
+	def Load(self, text):
+		path = os.path.join(self.tmpDir, 'profiles.tsv')
+		with open(path, 'w', newline='') as f:
+			f.write(text)
+		return aac.LoadProfilesFromFile(path)
+
+	def test_profiles_in_core_loci_order(self):
+		profiles = self.Load('Key\tL3\tL1\tL2\nA\t3\t1\t2\n')
+		self.assertEqual(profiles, {'A':[1, 2, 3]})
+
+	def test_missing_locus_is_zero(self):
+		profiles = self.Load('Key\tL1\tL3\nA\t1\t3\n')
+		self.assertEqual(profiles, {'A':[1, 0, 3]})
+
+	def test_trailing_delimiter_row(self):
+		profiles = self.Load('Key\tL1\tL2\tL3\nA\t1\t2\t3\t\nB\t4\t5\t6\n')
+		self.assertEqual(profiles, {'A':[1, 2, 3], 'B':[4, 5, 6]})
+
+	def test_trailing_delimiter_row_with_missing_locus(self):
+		# extra cell after the last heading must not stand in for the missing locus
+		profiles = self.Load('Key\tL1\tL3\nA\t1\t3\t\nB\t4\t6\t9\n')
+		self.assertEqual(profiles, {'A':[1, 0, 3], 'B':[4, 0, 6]})
+
+	def test_crlf_rows(self):
+		profiles = self.Load('Key\tL1\tL2\tL3\r\nA\t1\t2\t3\r\nB \t4\t5\t6 \r\n\r\n')
+		self.assertEqual(profiles, {'A':[1, 2, 3], 'B':[4, 5, 6]})
+
+	def test_short_row_and_blank_cells(self):
+		profiles = self.Load('Key\tL1\tL2\tL3\nA\t1\nB\t\t5\t \n')
+		self.assertEqual(profiles, {'A':[1, 0, 0], 'B':[0, 5, 0]})
+
+	def test_quotes_not_special(self):
+		aac.delim = ','
+		profiles = self.Load('Key,L1,L2,L3\n"A,1,2,3\n')
+		self.assertEqual(profiles, {'"A':[1, 2, 3]})
+
+	def test_out_of_range_calls_are_missing(self):
+		with self.assertLogs(aac.Logger, 'ERROR') as logged:
+			profiles = self.Load('Key\tL1\tL2\tL3\nA\t-1\t{}\t5\n'.format(aac.LANE_MAX + 1))
+		self.assertEqual(profiles, {'A':[0, 0, 5]})
+		# both named in the log
+		self.assertEqual(len(logged.output), 2)
+		self.assertIn('Allele call -1 of A at locus L1 is out of range', logged.output[0])
+		self.assertIn('of A at locus L2 is out of range', logged.output[1])
+
+	def test_largest_lane_value_kept(self):
+		profiles = self.Load('Key\tL1\tL2\tL3\nA\t0\t{}\t5\n'.format(aac.LANE_MAX))
+		self.assertEqual(profiles, {'A':[0, aac.LANE_MAX, 5]})
+
+	def test_pack_out_of_range_saved_calls(self):
+		self.assertEqual(aac.PackProfile([-3, 2, aac.LANE_MAX + 1]), aac.PackProfile([0, 2, 0]))
+
+
+if __name__ == '__main__':
+	unittest.main()
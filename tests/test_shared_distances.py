@@ -0,0 +1,54 @@
+import unittest
+from array import array
+
+from tests import LoadScript
+
+aac = LoadScript()
+
+
+class SharedDistancesTest(unittest.TestCase):
+	def setUp(self):
+		# A and B repeated twice more, C unique
+		self.profiles = {'a1':[1, 2, 3], 'b1':[4, 5, 6], 'a2':[1, 2, 3], 'c1':[7, 8, 9], 'b2':[4, 5, 6], 'a3':[1, 2, 3]}
+
+	def RunLikeDoCalc(self, shared):
+		# same calls, in the same order, as the naming loop in Calculator.DoCalc
+		taken = {}
+		for key in self.profiles:
+			distances = shared.Take(key)
+			taken[key] = distances.get(key)
+			distances.setdefault(key, array('d', [-1.0]*4))[0] = 1.0
+			shared.Keep(key, distances)
+		return taken
+
+	def test_identical_profiles_share_first_distances(self):
+		shared = aac.SharedDistances(self.profiles)
+		taken = self.RunLikeDoCalc(shared)
+		self.assertIsNone(taken['a1'])
+		self.assertIsNone(taken['c1'])
+		self.assertIsNotNone(taken['a2'])
+		self.assertIs(taken['a2'], taken['a3'])
+		self.assertIsNotNone(taken['b2'])
+
+	def test_distances_dropped_after_last_identical_profile(self):
+		shared = aac.SharedDistances(self.profiles)
+		self.RunLikeDoCalc(shared)
+		self.assertEqual(len(shared), 0)
+		self.assertEqual(len(shared._remaining), 0)
+
+	def test_unique_profiles_never_kept(self):
+		shared = aac.SharedDistances({'a':[1], 'b':[2]})
+		shared.Keep('a', {'a':array('d', [0.0])})
+		self.assertEqual(len(shared), 0)
+
+	def test_held_only_while_identical_profiles_remain(self):
+		shared = aac.SharedDistances(self.profiles)
+		shared.Keep('a1', {'a1':array('d', [0.0])})
+		shared.Take('a2')
+		self.assertEqual(len(shared), 1)
+		shared.Take('a3')
+		self.assertEqual(len(shared), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()